@@ -0,0 +1,44 @@
+"""Helpers shared by migrations that touch the partitioned emails table
+
+alembic.ini puts this directory on sys.path, so revisions import it as
+``partitioning``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+def email_partitions() -> list[str]:
+    """
+    List the partitions currently attached to emails.
+
+    Returns:
+        Partition table names, including emails_default
+    """
+    return op.get_bind().execute(sa.text("""
+        SELECT inhrelid::regclass::text
+        FROM pg_inherits
+        WHERE inhparent = 'emails'::regclass
+    """)).scalars().all()
+
+
+def create_partitioned_index(name: str, suffix: str, definition: str) -> None:
+    """
+    Build an index on emails without locking it against writes.
+
+    CONCURRENTLY is not supported on a partitioned table, so the parent
+    index is created ON ONLY emails (invalid until every partition is
+    attached), each partition's index is built concurrently, then attached.
+
+    Args:
+        name: Name of the parent index
+        suffix: Appended to each partition's name to name its index
+        definition: Everything after ``ON <table>``, e.g. the column list
+    """
+    partitions = email_partitions()
+
+    op.execute(f'CREATE INDEX {name} ON ONLY emails {definition}')
+
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_{suffix} ON {partition} {definition}')
+            op.execute(f'ALTER INDEX {name} ATTACH PARTITION {partition}_{suffix}')
@@ -17,8 +17,7 @@ depends_on = None
 
 
 def upgrade() -> None:
-    # Enable UUID extension
-    op.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"')
+    # gen_random_uuid() is built into PostgreSQL 13+, no extension needed
 
     # Enable pgvector extension
     op.execute('CREATE EXTENSION IF NOT EXISTS vector')
@@ -61,9 +60,11 @@ def upgrade() -> None:
     op.execute('ALTER TABLE emails ADD COLUMN embedding vector(1536)')
 
     # Create indexes for emails
-    op.create_index('idx_user_received', 'emails', ['user_id', sa.text('received_at DESC')])
-    op.create_index('idx_category', 'emails', ['category'])
-    op.create_index('idx_priority', 'emails', ['priority'])
+    # CONCURRENTLY avoids locking the table and cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_received ON emails (user_id, received_at DESC)')
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_category ON emails (category)')
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_priority ON emails (priority)')
 
     # Email Classifications Table
     op.create_table(
@@ -96,7 +97,11 @@ def upgrade() -> None:
     )
 
     # Create index for generated responses
-    op.create_index('idx_email_responses', 'generated_responses', ['email_id', sa.text('generation_timestamp DESC')])
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_responses '
+            'ON generated_responses (email_id, generation_timestamp DESC)'
+        )
 
     # User Preferences Table
     op.create_table(
@@ -179,4 +184,3 @@ def downgrade() -> None:
 
     # Drop extensions
     op.execute('DROP EXTENSION IF EXISTS vector')
-    op.execute('DROP EXTENSION IF EXISTS "uuid-ossp"')
@@ -15,11 +15,12 @@ down_revision = '001'
 branch_labels = None
 depends_on = None
 
+BACKFILL_BATCH_SIZE = 1000
+
 
 def upgrade() -> None:
     # Add google_id to users table
     op.add_column('users', sa.Column('google_id', sa.String(255), unique=True))
-    op.create_index('idx_google_id', 'users', ['google_id'])
 
     # Add token_expires_at to users table
     op.add_column('users', sa.Column('token_expires_at', sa.TIMESTAMP))
@@ -35,8 +36,33 @@ def upgrade() -> None:
     op.add_column('email_classifications', sa.Column('reasoning', sa.Text))
     op.add_column('email_classifications', sa.Column('metadata', sa.JSON))
 
-    # Update emails table - add updated_at column
-    op.add_column('emails', sa.Column('updated_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP')))
+    # Update emails table - add updated_at column. Added without a default so
+    # the ALTER is metadata-only; the default then applies to new rows only
+    op.add_column('emails', sa.Column('updated_at', sa.TIMESTAMP))
+    op.alter_column('emails', 'updated_at', server_default=sa.text('CURRENT_TIMESTAMP'))
+
+    # Backfill existing emails in batches, each committed on its own, so locks
+    # and WAL stay bounded and an interrupted run can simply be resumed.
+    # Runs before the updated_at trigger exists, which would overwrite the value.
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_emails_updated_at_backfill '
+            'ON emails (id) WHERE updated_at IS NULL'
+        )
+
+        conn = op.get_bind()
+        while True:
+            updated = conn.execute(sa.text("""
+                UPDATE emails
+                SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+                WHERE id IN (
+                    SELECT id FROM emails WHERE updated_at IS NULL LIMIT :batch_size
+                )
+            """), {'batch_size': BACKFILL_BATCH_SIZE}).rowcount
+            if updated < BACKFILL_BATCH_SIZE:
+                break
+
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS idx_emails_updated_at_backfill')
 
     # Add trigger for emails updated_at
     op.execute("""
@@ -45,11 +71,16 @@ def upgrade() -> None:
         FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
     """)
 
-    # Add index for sender_email
-    op.create_index('idx_sender_email', 'emails', ['sender_email'])
+    # Build indexes without locking users/emails against writes.
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_google_id ON users (google_id)')
+
+        # Add index for sender_email
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sender_email ON emails (sender_email)')
 
-    # Add index for message_id
-    op.create_index('idx_message_id', 'emails', ['message_id'])
+        # Add index for message_id
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_id ON emails (message_id)')
 
 
 def downgrade() -> None:
@@ -7,7 +7,6 @@ Create Date: 2025-10-07
 """
 from alembic import op
 import sqlalchemy as sa
-from pgvector.sqlalchemy import Vector
 
 # revision identifiers, used by Alembic.
 revision = '003'
@@ -20,17 +19,21 @@ def upgrade() -> None:
     # Enable pgvector extension
     op.execute('CREATE EXTENSION IF NOT EXISTS vector')
 
-    # Add embedding column to emails table
+    # Add embedding column to emails table (001 already creates it on fresh databases)
     # text-embedding-3-small produces 1536 dimensions
-    op.add_column('emails', sa.Column('embedding', Vector(1536)))
-
-    # Add index for vector similarity search using cosine distance
-    op.execute("""
-        CREATE INDEX idx_emails_embedding
-        ON emails
-        USING ivfflat (embedding vector_cosine_ops)
-        WITH (lists = 100)
-    """)
+    op.execute('ALTER TABLE emails ADD COLUMN IF NOT EXISTS embedding vector(1536)')
+
+    # Add HNSW index for vector similarity search using cosine distance.
+    # Unlike ivfflat, HNSW needs no training data, so it can be built on an
+    # empty table and keeps its recall as the mailbox grows.
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_emails_embedding
+            ON emails
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = 16, ef_construction = 64)
+        """)
 
     # Add user preferences column to users table
     op.add_column('users', sa.Column('preferences', sa.JSON, server_default='{}'))
@@ -38,7 +41,8 @@ def upgrade() -> None:
 
 def downgrade() -> None:
     # Drop index
-    op.execute('DROP INDEX IF EXISTS idx_emails_embedding')
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS idx_emails_embedding')
 
     # Remove columns
     op.drop_column('emails', 'embedding')
@@ -0,0 +1,212 @@
+"""Partition emails table by received_at
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-10-14
+
+"""
+from alembic import op
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# Tables whose email_id used to be a foreign key to emails.id. A partitioned
+# table can only expose unique constraints that include the partition key,
+# so these references are enforced by the ORM cascade and cleaned up by
+# drop_emails_partitions_before() instead.
+EMAIL_CHILD_TABLES = ['email_classifications', 'generated_responses', 'user_feedback']
+
+EMAIL_INDEXES = [
+    'idx_user_received',
+    'idx_category',
+    'idx_priority',
+    'idx_sender_email',
+    'idx_message_id',
+    'idx_emails_embedding',
+]
+
+
+def _create_email_indexes() -> None:
+    # Created on the partitioned parent, so every partition gets its own,
+    # smaller local index (including the HNSW vector index)
+    op.execute('CREATE INDEX idx_user_received ON emails (user_id, received_at DESC)')
+    op.execute('CREATE INDEX idx_category ON emails (category)')
+    op.execute('CREATE INDEX idx_priority ON emails (priority)')
+    op.execute('CREATE INDEX idx_sender_email ON emails (sender_email)')
+    op.execute('CREATE INDEX idx_message_id ON emails (message_id)')
+    op.execute("""
+        CREATE INDEX idx_emails_embedding
+        ON emails
+        USING hnsw (embedding vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+    """)
+
+
+def _drop_email_indexes() -> None:
+    for index_name in EMAIL_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+def upgrade() -> None:
+    # Detach child tables from emails.id
+    for table in EMAIL_CHILD_TABLES:
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_email_id_fkey')
+
+    # Move the existing table out of the way
+    op.execute('DROP TRIGGER IF EXISTS update_emails_updated_at ON emails')
+    op.execute('ALTER TABLE emails RENAME TO emails_legacy')
+    op.execute('ALTER TABLE emails_legacy RENAME CONSTRAINT emails_pkey TO emails_legacy_pkey')
+    op.execute('ALTER TABLE emails_legacy RENAME CONSTRAINT emails_message_id_key TO emails_legacy_message_id_key')
+    _drop_email_indexes()
+
+    # The partition key must be part of every unique constraint
+    op.execute("""
+        UPDATE emails_legacy
+        SET received_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+        WHERE received_at IS NULL
+    """)
+
+    # Partitioned emails table
+    op.execute("""
+        CREATE TABLE emails (LIKE emails_legacy INCLUDING DEFAULTS)
+        PARTITION BY RANGE (received_at)
+    """)
+    op.execute('ALTER TABLE emails ALTER COLUMN received_at SET NOT NULL')
+    op.execute('ALTER TABLE emails ALTER COLUMN received_at SET DEFAULT CURRENT_TIMESTAMP')
+    op.execute('ALTER TABLE emails ADD CONSTRAINT emails_pkey PRIMARY KEY (id, received_at)')
+    op.execute('ALTER TABLE emails ADD CONSTRAINT emails_message_id_key UNIQUE (message_id, received_at)')
+    op.execute("""
+        ALTER TABLE emails ADD CONSTRAINT emails_user_id_fkey
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    """)
+
+    # Catch-all for rows outside the monthly partitions
+    op.execute('CREATE TABLE emails_default PARTITION OF emails DEFAULT')
+
+    # Creates the monthly partition emails_YYYY_MM, moving any rows for that
+    # month out of the default partition first
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_emails_partition(month_start DATE)
+        RETURNS VOID AS $$
+        DECLARE
+            partition_name TEXT := format('emails_%s', to_char(month_start, 'YYYY_MM'));
+            range_start DATE := date_trunc('month', month_start)::DATE;
+            range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN;
+            END IF;
+
+            EXECUTE format('CREATE TABLE %I (LIKE emails INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM emails_default WHERE received_at >= %L AND received_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                range_start, range_end, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE emails ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, range_start, range_end
+            );
+        END;
+        $$ language 'plpgsql';
+    """)
+
+    # Retention: drops whole monthly partitions ending on or before cutoff,
+    # along with the rows that referenced their emails
+    op.execute("""
+        CREATE OR REPLACE FUNCTION drop_emails_partitions_before(cutoff DATE)
+        RETURNS INTEGER AS $$
+        DECLARE
+            partition_name TEXT;
+            dropped INTEGER := 0;
+        BEGIN
+            FOR partition_name IN
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = 'emails'
+                  AND child.relname ~ '^emails_[0-9]{4}_[0-9]{2}$'
+                  AND (to_date(substring(child.relname FROM 8), 'YYYY_MM') + INTERVAL '1 month') <= cutoff
+            LOOP
+                EXECUTE format('DELETE FROM email_classifications WHERE email_id IN (SELECT id FROM %I)', partition_name);
+                EXECUTE format('DELETE FROM generated_responses WHERE email_id IN (SELECT id FROM %I)', partition_name);
+                EXECUTE format('DELETE FROM user_feedback WHERE email_id IN (SELECT id FROM %I)', partition_name);
+                EXECUTE format('DROP TABLE %I', partition_name);
+                dropped := dropped + 1;
+            END LOOP;
+
+            DELETE FROM email_classifications WHERE email_id IN (SELECT id FROM emails_default WHERE received_at < cutoff);
+            DELETE FROM generated_responses WHERE email_id IN (SELECT id FROM emails_default WHERE received_at < cutoff);
+            DELETE FROM user_feedback WHERE email_id IN (SELECT id FROM emails_default WHERE received_at < cutoff);
+            DELETE FROM emails_default WHERE received_at < cutoff;
+
+            RETURN dropped;
+        END;
+        $$ language 'plpgsql';
+    """)
+
+    # Monthly partitions covering existing data plus the next three months
+    op.execute("""
+        SELECT create_emails_partition(month_start::DATE)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(received_at) FROM emails_legacy), CURRENT_TIMESTAMP)),
+            date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '3 months',
+            INTERVAL '1 month'
+        ) AS month_start
+    """)
+
+    # Copy data and drop the old table
+    op.execute('INSERT INTO emails SELECT * FROM emails_legacy')
+    op.execute('DROP TABLE emails_legacy')
+
+    _create_email_indexes()
+
+    op.execute("""
+        CREATE TRIGGER update_emails_updated_at
+        BEFORE UPDATE ON emails
+        FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS update_emails_updated_at ON emails')
+    op.execute('ALTER TABLE emails RENAME TO emails_partitioned')
+    op.execute('ALTER TABLE emails_partitioned RENAME CONSTRAINT emails_pkey TO emails_partitioned_pkey')
+    op.execute('ALTER TABLE emails_partitioned RENAME CONSTRAINT emails_message_id_key TO emails_partitioned_message_id_key')
+    op.execute('ALTER TABLE emails_partitioned RENAME CONSTRAINT emails_user_id_fkey TO emails_partitioned_user_id_fkey')
+    _drop_email_indexes()
+
+    # Plain emails table
+    op.execute('CREATE TABLE emails (LIKE emails_partitioned INCLUDING DEFAULTS)')
+    op.execute('ALTER TABLE emails ALTER COLUMN received_at DROP NOT NULL')
+    op.execute('ALTER TABLE emails ALTER COLUMN received_at DROP DEFAULT')
+    op.execute('ALTER TABLE emails ADD CONSTRAINT emails_pkey PRIMARY KEY (id)')
+    op.execute('ALTER TABLE emails ADD CONSTRAINT emails_message_id_key UNIQUE (message_id)')
+    op.execute("""
+        ALTER TABLE emails ADD CONSTRAINT emails_user_id_fkey
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    """)
+
+    op.execute('INSERT INTO emails SELECT * FROM emails_partitioned')
+    op.execute('DROP TABLE emails_partitioned CASCADE')
+
+    op.execute('DROP FUNCTION IF EXISTS create_emails_partition(DATE)')
+    op.execute('DROP FUNCTION IF EXISTS drop_emails_partitions_before(DATE)')
+
+    _create_email_indexes()
+
+    op.execute("""
+        CREATE TRIGGER update_emails_updated_at
+        BEFORE UPDATE ON emails
+        FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    """)
+
+    # Restore foreign keys from child tables
+    for table in EMAIL_CHILD_TABLES:
+        op.execute(f"""
+            ALTER TABLE {table} ADD CONSTRAINT {table}_email_id_fkey
+            FOREIGN KEY (email_id) REFERENCES emails (id) ON DELETE CASCADE
+        """)
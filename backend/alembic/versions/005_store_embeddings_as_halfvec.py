@@ -0,0 +1,42 @@
+"""Store email embeddings as halfvec
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-10-15
+
+"""
+from alembic import op
+from partitioning import create_partitioned_index
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def _create_embedding_index(opclass: str) -> None:
+    # HNSW over cosine distance; the opclass has to match the column type
+    # (halfvec after upgrade, vector after downgrade)
+    create_partitioned_index(
+        'idx_emails_embedding',
+        'embedding_idx',
+        f'USING hnsw (embedding {opclass}) WITH (m = 16, ef_construction = 64)'
+    )
+
+
+def upgrade() -> None:
+    # halfvec needs pgvector 0.7+; FP16 halves the bytes read per distance
+    # computation with negligible recall loss for cosine ranking
+    op.execute('ALTER EXTENSION vector UPDATE')
+
+    op.execute('DROP INDEX IF EXISTS idx_emails_embedding')
+    op.execute('ALTER TABLE emails ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536)')
+
+    _create_embedding_index('halfvec_cosine_ops')
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS idx_emails_embedding')
+    op.execute('ALTER TABLE emails ALTER COLUMN embedding TYPE vector(1536) USING embedding::vector(1536)')
+
+    _create_embedding_index('vector_cosine_ops')
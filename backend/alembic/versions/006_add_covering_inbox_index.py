@@ -0,0 +1,45 @@
+"""Add covering index for the inbox list query
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+from partitioning import create_partitioned_index
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# Columns the inbox list reads alongside (user_id, received_at), so the
+# query can be answered by an index-only scan. subject is left out: it is
+# unbounded TEXT and a long one would exceed the B-tree row size limit and
+# fail the insert.
+COVERING_COLUMNS = 'category, priority, requires_action, sender_email, sender_name'
+
+
+def upgrade() -> None:
+    create_partitioned_index(
+        'idx_user_received_covering',
+        'user_received_covering_idx',
+        f'(user_id, received_at DESC) INCLUDE ({COVERING_COLUMNS})'
+    )
+
+    # Same leading columns, so the covering index replaces it
+    op.execute('DROP INDEX IF EXISTS idx_user_received')
+
+    # Index-only scans skip the heap only for pages marked all-visible
+    with op.get_context().autocommit_block():
+        op.execute('VACUUM ANALYZE emails')
+
+
+def downgrade() -> None:
+    create_partitioned_index(
+        'idx_user_received',
+        'user_received_idx',
+        '(user_id, received_at DESC)'
+    )
+
+    op.execute('DROP INDEX IF EXISTS idx_user_received_covering')
@@ -0,0 +1,69 @@
+"""Compress email bodies with lz4
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+from partitioning import email_partitions
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+BODY_COLUMNS = ['body_text', 'body_html']
+
+
+def _create_partition_function(like_options: str) -> None:
+    # Same as create_emails_partition() from 004, with configurable LIKE
+    # options so new partitions can inherit column compression
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION create_emails_partition(month_start DATE)
+        RETURNS VOID AS $$
+        DECLARE
+            partition_name TEXT := format('emails_%s', to_char(month_start, 'YYYY_MM'));
+            range_start DATE := date_trunc('month', month_start)::DATE;
+            range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN;
+            END IF;
+
+            EXECUTE format('CREATE TABLE %I (LIKE emails {like_options})', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM emails_default WHERE received_at >= %L AND received_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                range_start, range_end, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE emails ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, range_start, range_end
+            );
+        END;
+        $$ language 'plpgsql';
+    """)
+
+
+def _set_body_compression(method: str) -> None:
+    # SET COMPRESSION does not recurse, so it is applied to the parent and
+    # every partition. Only values written from now on use the new method.
+    alterations = ', '.join(
+        f'ALTER COLUMN {column} SET COMPRESSION {method}' for column in BODY_COLUMNS
+    )
+    for table in ['emails', *email_partitions()]:
+        op.execute(f'ALTER TABLE {table} {alterations}')
+
+
+def upgrade() -> None:
+    # Bodies are large and read far less often than the rest of the row;
+    # lz4 (PostgreSQL 14+) compresses and decompresses them much faster than
+    # the default pglz
+    _set_body_compression('lz4')
+    _create_partition_function('INCLUDING DEFAULTS INCLUDING COMPRESSION')
+
+
+def downgrade() -> None:
+    _set_body_compression('DEFAULT')
+    _create_partition_function('INCLUDING DEFAULTS')
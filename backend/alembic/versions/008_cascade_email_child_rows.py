@@ -0,0 +1,62 @@
+"""Delete email child rows when their email is deleted
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-10-17
+
+"""
+from alembic import op
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+# Migration 004 dropped the email_id foreign keys (emails.id alone is no
+# longer unique once emails is partitioned), which also dropped their
+# ON DELETE CASCADE. This trigger restores it in the database, so deleting
+# a user (cascading to emails) or an email directly doesn't leave orphans.
+# Dropped partitions fire no triggers; drop_emails_partitions_before()
+# already deletes their child rows itself.
+EMAIL_CHILD_TABLES = ['email_classifications', 'generated_responses', 'user_feedback']
+
+
+def upgrade() -> None:
+    # Child lookups by email_id for the trigger (generated_responses already
+    # has idx_email_responses leading with email_id)
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_classifications_email_id '
+            'ON email_classifications (email_id)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_feedback_email_id '
+            'ON user_feedback (email_id)'
+        )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION delete_email_child_rows()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM email_classifications WHERE email_id = OLD.id;
+            DELETE FROM generated_responses WHERE email_id = OLD.id;
+            DELETE FROM user_feedback WHERE email_id = OLD.id;
+            RETURN OLD;
+        END;
+        $$ language 'plpgsql';
+    """)
+
+    # Defined on the partitioned parent, so every partition (current and
+    # future) gets it
+    op.execute("""
+        CREATE TRIGGER delete_email_child_rows
+        AFTER DELETE ON emails
+        FOR EACH ROW EXECUTE FUNCTION delete_email_child_rows();
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS delete_email_child_rows ON emails')
+    op.execute('DROP FUNCTION IF EXISTS delete_email_child_rows()')
+    op.execute('DROP INDEX IF EXISTS idx_user_feedback_email_id')
+    op.execute('DROP INDEX IF EXISTS idx_email_classifications_email_id')
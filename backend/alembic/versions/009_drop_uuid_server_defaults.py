@@ -0,0 +1,30 @@
+"""Drop gen_random_uuid() defaults from ids generated by the application
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-10-17
+
+"""
+from alembic import op
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# These tables get UUIDv7 ids from their models (and the COPY path in
+# fetch_new_emails), so a v4 server default would only hide inserts that
+# forget the id. Dropping a default is a catalog change; no rows are rewritten.
+# The remaining tables have no model yet and keep their defaults.
+UUID7_TABLES = ['users', 'emails', 'email_classifications']
+
+
+def upgrade() -> None:
+    for table in UUID7_TABLES:
+        # On the partitioned emails table this also applies to every partition
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT')
+
+
+def downgrade() -> None:
+    for table in UUID7_TABLES:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id SET DEFAULT gen_random_uuid()')
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from datetime import datetime, timedelta
 from typing import Dict, Any
+import httpx
 
 from app.core.config import settings
 from app.core.database import get_db
@@ -19,21 +20,26 @@ SCOPES = [
     'https://www.googleapis.com/auth/userinfo.profile',
 ]
 
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+GOOGLE_USERINFO_URI = "https://openidconnect.googleapis.com/v1/userinfo"
+GOOGLE_HTTP_TIMEOUT = 10.0
+
+# Static OAuth client config, built once instead of per request
+_CLIENT_CONFIG = {
+    "web": {
+        "client_id": settings.GOOGLE_CLIENT_ID,
+        "client_secret": settings.GOOGLE_CLIENT_SECRET,
+        "redirect_uris": [settings.GOOGLE_REDIRECT_URI],
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": GOOGLE_TOKEN_URI,
+    }
+}
+
 
 def get_oauth_flow(state: str = None) -> Flow:
     """Create OAuth flow object"""
-    client_config = {
-        "web": {
-            "client_id": settings.GOOGLE_CLIENT_ID,
-            "client_secret": settings.GOOGLE_CLIENT_SECRET,
-            "redirect_uris": [settings.GOOGLE_REDIRECT_URI],
-            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-            "token_uri": "https://oauth2.googleapis.com/token",
-        }
-    }
-
     flow = Flow.from_client_config(
-        client_config,
+        _CLIENT_CONFIG,
         scopes=SCOPES,
         state=state
     )
@@ -70,67 +76,89 @@ async def google_login():
 async def google_callback(
     code: str,
     state: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Handle Google OAuth callback"""
     try:
         # Exchange code for tokens
-        flow = get_oauth_flow(state=state)
-        flow.fetch_token(code=code)
-        credentials = flow.credentials
+        tokens = await request_google_token({
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+        })
+        access_token = tokens['access_token']
+        refresh_token = tokens.get('refresh_token')
 
         # Get user info from Google
-        user_info = get_user_info(credentials)
-
-        # Check if user exists
-        user = db.query(User).filter(User.google_id == user_info['id']).first()
+        user_info = await get_user_info(access_token)
 
         # Calculate token expiration
-        token_expires_at = datetime.utcnow() + timedelta(seconds=credentials.expiry.timestamp() - datetime.utcnow().timestamp()) if credentials.expiry else None
-
-        if user:
-            # Update existing user
-            user.access_token = credentials.token
-            user.refresh_token = credentials.refresh_token or user.refresh_token
-            user.token_expires_at = token_expires_at
-            user.email = user_info['email']
-            user.name = user_info.get('name', user.name)
-            user.updated_at = datetime.utcnow()
-        else:
-            # Create new user
-            user = User(
-                email=user_info['email'],
-                name=user_info.get('name'),
-                google_id=user_info['id'],
-                access_token=credentials.token,
-                refresh_token=credentials.refresh_token,
-                token_expires_at=token_expires_at
-            )
-            db.add(user)
-
-        db.commit()
-        db.refresh(user)
+        token_expires_at = datetime.utcnow() + timedelta(seconds=tokens['expires_in']) if tokens.get('expires_in') else None
+
+        # Create or update the user in one round trip; ON CONFLICT also keeps
+        # concurrent sign-ins for the same account from racing
+        stmt = pg_insert(User).values(
+            email=user_info['email'],
+            name=user_info.get('name'),
+            google_id=user_info['id'],
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_expires_at=token_expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.google_id],
+            set_={
+                'email': stmt.excluded.email,
+                'name': func.coalesce(stmt.excluded.name, User.name),
+                'access_token': stmt.excluded.access_token,
+                'refresh_token': func.coalesce(stmt.excluded.refresh_token, User.refresh_token),
+                'token_expires_at': stmt.excluded.token_expires_at,
+                'updated_at': datetime.utcnow(),
+            }
+        ).returning(User.id, User.email)
+
+        user = (await db.execute(stmt)).one()
+        await db.commit()
 
         return AuthResponse(
             status="authenticated",
             user_id=str(user.id),
             email=user.email,
-            access_token=credentials.token
+            access_token=access_token
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Authentication failed: {str(e)}"
         )
 
 
-def get_user_info(credentials: Credentials) -> Dict[str, Any]:
+async def request_google_token(data: Dict[str, str]) -> Dict[str, Any]:
+    """POST a grant to Google's token endpoint without blocking the event loop"""
+    async with httpx.AsyncClient(timeout=GOOGLE_HTTP_TIMEOUT) as client:
+        response = await client.post(GOOGLE_TOKEN_URI, data={
+            **data,
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+        })
+        response.raise_for_status()
+        return response.json()
+
+
+async def get_user_info(access_token: str) -> Dict[str, Any]:
     """Get user information from Google"""
     try:
-        service = build('oauth2', 'v2', credentials=credentials)
-        user_info = service.userinfo().get().execute()
+        async with httpx.AsyncClient(timeout=GOOGLE_HTTP_TIMEOUT) as client:
+            response = await client.get(
+                GOOGLE_USERINFO_URI,
+                headers={"Authorization": f"Bearer {access_token}"}
+            )
+            response.raise_for_status()
+        user_info = response.json()
+        # The OpenID Connect endpoint returns the Google account id as `sub`
+        user_info.setdefault('id', user_info.get('sub'))
         return user_info
     except Exception as e:
         raise HTTPException(
@@ -142,11 +170,12 @@ def get_user_info(credentials: Credentials) -> Dict[str, Any]:
 @router.post("/refresh")
 async def refresh_token(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Refresh access token using refresh token"""
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
 
         if not user:
             raise HTTPException(
@@ -160,36 +189,30 @@ async def refresh_token(
                 detail="No refresh token available"
             )
 
-        # Create credentials object
-        credentials = Credentials(
-            token=user.access_token,
-            refresh_token=user.refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET
-        )
-
         # Refresh the token
-        from google.auth.transport.requests import Request
-        credentials.refresh(Request())
+        tokens = await request_google_token({
+            "grant_type": "refresh_token",
+            "refresh_token": user.refresh_token,
+        })
+        expires_at = datetime.utcnow() + timedelta(seconds=tokens['expires_in']) if tokens.get('expires_in') else None
 
         # Update user with new tokens
-        user.access_token = credentials.token
-        if credentials.refresh_token:
-            user.refresh_token = credentials.refresh_token
-        user.token_expires_at = credentials.expiry
+        user.access_token = tokens['access_token']
+        if tokens.get('refresh_token'):
+            user.refresh_token = tokens['refresh_token']
+        user.token_expires_at = expires_at
         user.updated_at = datetime.utcnow()
 
-        db.commit()
+        await db.commit()
 
         return {
             "status": "success",
-            "access_token": credentials.token,
-            "expires_at": credentials.expiry
+            "access_token": user.access_token,
+            "expires_at": expires_at
         }
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Token refresh failed: {str(e)}"
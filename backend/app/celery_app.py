@@ -1,28 +1,68 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
+from kombu.serialization import register
 from app.core.config import settings
+import orjson
 
+# orjson is several times faster than stdlib json and returns bytes directly.
+# Types it can't handle natively (e.g. Decimal) fall back to str, as kombu's
+# json serializer does.
+register(
+    'orjson',
+    lambda obj: orjson.dumps(obj, default=str),
+    orjson.loads,
+    content_type='application/x-orjson',
+    content_encoding='utf-8'
+)
+
+# Results go to the database rather than the broker's Redis, so stored
+# task results don't compete with queued messages for Redis memory
 celery_app = Celery(
     'email_auto_organizer',
     broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL,
+    backend=settings.CELERY_RESULT_BACKEND or f'db+{settings.DATABASE_URL}',
     include=[
         'app.workers.email_processor',
-        'app.workers.sync_worker'
+        'app.workers.sync_worker',
+        'app.workers.maintenance',
+        'app.workers.tasks'
     ]
 )
 
 # Celery configuration
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer='orjson',
+    accept_content=['orjson', 'json'],
+    result_serializer='orjson',
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
     task_time_limit=300,  # 5 minutes
     task_soft_time_limit=240,  # 4 minutes
-    worker_prefetch_multiplier=1,
+    # Ack after the task finishes, so a chunk lost with its worker is
+    # redelivered; with prefetch 1 a worker busy on a long chunk doesn't
+    # hold back queued tasks
+    task_acks_late=True,
+    worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH_MULTIPLIER,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
     worker_max_tasks_per_child=1000,
+    # Triage tasks wait on OpenAI, Redis and Postgres almost all the time and
+    # run on a gevent worker (-Q triage -P gevent); Gmail sync does the MIME
+    # parsing and stays on prefork workers (-Q sync,celery). The embedding
+    # tasks write through COPY (copy_expert), which psycopg2 refuses once
+    # psycogreen's wait callback is installed, so they stay on prefork too.
+    # Exact names take precedence over the glob.
+    task_routes={
+        'app.workers.email_processor.batch_embed_emails': {'queue': 'sync'},
+        'app.workers.email_processor.process_email_chunk': {'queue': 'sync'},
+        'app.workers.email_processor.*': {'queue': 'triage'},
+        # Placeholder tasks in app.workers.tasks (explicit names)
+        'process_email': {'queue': 'triage'},
+        'process_email_batch': {'queue': 'triage'},
+        'generate_response': {'queue': 'triage'},
+        'sync_emails': {'queue': 'sync'},
+        'app.workers.sync_worker.*': {'queue': 'sync'},
+    },
 )
 
 # Celery Beat schedule for periodic tasks
@@ -31,7 +71,35 @@ celery_app.conf.beat_schedule = {
         'task': 'app.workers.sync_worker.sync_all_users_emails',
         'schedule': 300.0,  # Every 5 minutes
     },
+    'maintain-email-partitions-daily': {
+        'task': 'app.workers.maintenance.maintain_email_partitions',
+        'schedule': 86400.0,  # Every 24 hours
+    },
 }
 
+
+@worker_init.connect
+def init_worker(**kwargs):
+    """Make psycopg2 cooperative when the worker runs on the gevent pool"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+
+    # celery -P gevent monkey-patches the stdlib before the app is loaded;
+    # psycopg2 is a C extension and needs its own wait callback, otherwise
+    # every query blocks all greenlets
+    if monkey.is_module_patched('socket'):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Build the shared OpenAI client when each pool process starts, not on its first task"""
+    from app.services.openai_client import get_openai_client
+    get_openai_client()
+
+
 if __name__ == '__main__':
     celery_app.start()
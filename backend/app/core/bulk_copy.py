@@ -0,0 +1,80 @@
+"""
+Bulk writes through PostgreSQL COPY.
+
+COPY streams every row to the server in a single round trip, instead of
+one parse/plan/execute cycle per INSERT. Rows are copied into a temporary
+staging table, from which the caller moves them into the real table with a
+single INSERT ... SELECT (or UPDATE ... FROM), so conflict handling stays in
+plain SQL.
+"""
+import io
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def _copy_value(value: Any) -> str:
+    """Render a value in COPY text format"""
+    if value is None:
+        return r'\N'
+
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Timestamp columns store naive UTC
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    elif hasattr(value, 'tolist'):
+        # numpy arrays (embeddings)
+        value = value.tolist()
+
+    if isinstance(value, (list, tuple)):
+        # pgvector text input: [1.0,2.0,...]
+        value = '[' + ','.join(str(v) for v in value) + ']'
+
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_to_temp_table(
+    db: Session,
+    temp_table: str,
+    source_table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]]
+) -> None:
+    """
+    COPY rows into a temporary table shaped like columns of source_table
+
+    The temp table is created in the session's current transaction and is
+    dropped when that transaction commits or rolls back.
+
+    Args:
+        db: Database session
+        temp_table: Name of the temp table to create
+        source_table: Table the column types are taken from
+        columns: Column names, in the order of the values in each row
+        rows: Row value sequences
+    """
+    column_list = ', '.join(columns)
+
+    db.execute(text(
+        f'CREATE TEMP TABLE {temp_table} ON COMMIT DROP AS '
+        f'SELECT {column_list} FROM {source_table} WITH NO DATA'
+    ))
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY {temp_table} ({column_list}) FROM STDIN', buffer)
+    finally:
+        cursor.close()
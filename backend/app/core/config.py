@@ -1,4 +1,5 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
@@ -9,13 +10,32 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
+    DB_POOL_SIZE: int = 10  # Sync engine (workers); size to the pool's concurrency
+    DB_MAX_OVERFLOW: int = 20
+    DB_STATEMENT_TIMEOUT_MS: int = 5000  # Caps API queries; 0 disables
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
 
+    # Celery (broker is REDIS_URL)
+    CELERY_RESULT_BACKEND: Optional[str] = None  # Defaults to db+DATABASE_URL
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = 1  # Raise for I/O-bound (OpenAI) workers
+    CELERY_WORKER_CONCURRENCY: int = 8  # Each worker process holds its own sync DB pool
+
     # OpenAI
     OPENAI_API_KEY: str
-    OPENAI_MODEL: str = "gpt-4-turbo-preview"
+    OPENAI_MODEL: str = "gpt-4o-mini"  # must support structured outputs
+
+    # Email retention (emails are partitioned by month on received_at)
+    EMAIL_RETENTION_MONTHS: int = 24
+    EMAIL_PARTITIONS_AHEAD: int = 3  # Future monthly partitions kept precreated
+
+    # Vector search
+    HNSW_EF_SEARCH: int = 40  # Candidate list size for HNSW scans (recall vs latency)
+    # pgvector 0.8+: keep scanning the index until per-user filters yield
+    # enough rows ("strict_order" or "relaxed_order"); None leaves it off
+    HNSW_ITERATIVE_SCAN: Optional[str] = None
 
     # Email Provider (Gmail OAuth)
     GOOGLE_CLIENT_ID: str
@@ -27,9 +47,19 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    # Settings are read once at startup and never mutated
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        env_nested_delimiter=None,
+        frozen=True,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings instance"""
+    return Settings()
 
 
-settings = Settings()
+settings = get_settings()
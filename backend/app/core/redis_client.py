@@ -1,7 +1,9 @@
 import redis.asyncio as redis
+from redis import Redis
 from app.core.config import settings
 
 redis_client = None
+sync_redis_client = None
 
 
 async def get_redis():
@@ -18,6 +20,19 @@ async def get_redis():
     return redis_client
 
 
+def get_sync_redis() -> Redis:
+    """
+    Get blocking Redis client instance for Celery workers and services
+
+    Responses are returned as bytes, so binary values (e.g. packed
+    embeddings) round-trip unchanged.
+    """
+    global sync_redis_client
+    if sync_redis_client is None:
+        sync_redis_client = Redis.from_url(settings.REDIS_URL)
+    return sync_redis_client
+
+
 async def close_redis():
     """
     Close Redis connection
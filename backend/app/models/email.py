@@ -1,34 +1,52 @@
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Numeric, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Numeric, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
-from pgvector.sqlalchemy import Vector
-import uuid
+from sqlalchemy.orm import relationship, deferred
+from pgvector.sqlalchemy import HALFVEC
+from uuid6 import uuid7
 from datetime import datetime
 from app.core.database import Base
 
 
 class Email(Base):
     __tablename__ = "emails"
+    # Range-partitioned by month on received_at (see migration 004), so the
+    # partition key is part of the primary key and every unique constraint
+    __table_args__ = (
+        UniqueConstraint('message_id', 'received_at', name='emails_message_id_key'),
+        {'postgresql_partition_by': 'RANGE (received_at)'},
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # UUIDv7 ids are time-ordered, so inserts land on the rightmost index page
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    message_id = Column(String(255), unique=True, nullable=False, index=True)
+    message_id = Column(String(255), nullable=False, index=True)
     subject = Column(Text)
     sender_email = Column(String(255), index=True)
     sender_name = Column(String(255))
-    body_text = Column(Text)
-    body_html = Column(Text)
-    received_at = Column(DateTime)
+    # Bodies are large and lz4-compressed in TOAST (migration 007); they are
+    # only loaded on access, or up front with undefer_group('body')
+    body_text = deferred(Column(Text), group='body')
+    body_html = deferred(Column(Text), group='body')
+    received_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     processed_at = Column(DateTime)
     category = Column(String(50))
     priority = Column(String(20))
     urgency_score = Column(Numeric(3, 2))
     sentiment = Column(String(20))
     requires_action = Column(Boolean, default=False)
-    embedding = Column(Vector(1536))  # OpenAI text-embedding-3-small produces 1536 dimensions
+    # OpenAI text-embedding-3-small produces 1536 dimensions, stored as FP16
+    # (halfvec) to halve vector I/O. Indexed with HNSW; see
+    # app.services.embedding_service for the required kNN query shape.
+    embedding = Column(HALFVEC(1536))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user = relationship("User", back_populates="emails")
-    classifications = relationship("EmailClassification", back_populates="email", cascade="all, delete-orphan")
+    classifications = relationship(
+        "EmailClassification",
+        primaryjoin="Email.id == foreign(EmailClassification.email_id)",
+        back_populates="email",
+        cascade="all, delete-orphan",
+        lazy="selectin"
+    )
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Text, DateTime, Numeric, ForeignKey, JSON
+from sqlalchemy import Column, String, Text, DateTime, Numeric, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
+from uuid6 import uuid7
 from datetime import datetime
 from app.core.database import Base
 
@@ -9,17 +9,25 @@ from app.core.database import Base
 class EmailClassification(Base):
     __tablename__ = "email_classifications"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    email_id = Column(UUID(as_uuid=True), ForeignKey('emails.id', ondelete='CASCADE'), nullable=False)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    # Not a foreign key: emails is partitioned, so emails.id alone isn't
+    # unique. Child rows are removed by the delete_email_child_rows trigger
+    # (migration 008).
+    email_id = Column(UUID(as_uuid=True), nullable=False)
     category = Column(String(50), nullable=False)
     priority = Column(String(20), nullable=False)
     urgency_score = Column(Numeric(3, 2))
     sentiment = Column(String(20))
     confidence_score = Column(Numeric(3, 2))
     reasoning = Column(Text)
-    metadata = Column(JSON)
+    # "metadata" is reserved on declarative models; keep the DB column name
+    extra_metadata = Column("metadata", JSON)
     model_version = Column(String(50))
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    email = relationship("Email", back_populates="classifications")
+    email = relationship(
+        "Email",
+        primaryjoin="foreign(EmailClassification.email_id) == Email.id",
+        back_populates="classifications"
+    )
@@ -1,5 +1,5 @@
 from app.schemas.user import User, UserCreate, UserUpdate, UserInDB
-from app.schemas.email import Email, EmailCreate, EmailUpdate, EmailInDB, EmailWithClassification
+from app.schemas.email import Email, EmailCreate, EmailUpdate, EmailInDB, EmailWithClassification, AIClassification, AIClassificationBatch
 from app.schemas.auth import GoogleAuthURL, GoogleCallback, TokenData, AuthResponse, TokenRefresh
 
 __all__ = [
@@ -12,6 +12,8 @@ __all__ = [
     "EmailUpdate",
     "EmailInDB",
     "EmailWithClassification",
+    "AIClassification",
+    "AIClassificationBatch",
     "GoogleAuthURL",
     "GoogleCallback",
     "TokenData",
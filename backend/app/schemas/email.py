@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import Literal, Optional
 from decimal import Decimal
 
 
@@ -49,5 +49,24 @@ class Email(EmailInDB):
     pass
 
 
+class AIClassification(BaseModel):
+    """Structured output schema for the classification model"""
+    model_config = ConfigDict(extra='forbid')
+
+    category: Literal['work', 'personal', 'marketing', 'support', 'finance', 'other']
+    priority: Literal['urgent', 'high', 'medium', 'low']
+    urgency_score: float
+    sentiment: Literal['positive', 'neutral', 'negative']
+    requires_action: bool
+    reasoning: str
+
+
+class AIClassificationBatch(BaseModel):
+    """Structured output schema for classifying several emails in one request"""
+    model_config = ConfigDict(extra='forbid')
+
+    classifications: list[AIClassification]
+
+
 class EmailWithClassification(Email):
     classification: Optional[dict] = None
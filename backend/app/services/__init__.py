@@ -1,4 +1,5 @@
 from app.services.triage_service import TriageService
+from app.services.triage_batcher import TriageBatcher
 from app.services.priority_engine import PriorityEngine
 from app.services.embedding_service import EmbeddingService
 from app.services.confidence_service import ConfidenceService
@@ -6,6 +7,7 @@ from app.services.complete_triage import CompleteTriageService
 
 __all__ = [
     'TriageService',
+    'TriageBatcher',
     'PriorityEngine',
     'EmbeddingService',
     'ConfidenceService',
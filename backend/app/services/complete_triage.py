@@ -1,45 +1,86 @@
+import asyncio
+import numpy as np
 from app.services.triage_service import TriageService
+from app.services.triage_batcher import TriageBatcher
 from app.services.priority_engine import PriorityEngine
 from app.services.embedding_service import EmbeddingService
 from app.services.confidence_service import ConfidenceService
+from sqlalchemy.orm import Session
 from app.models.email import Email
 from app.models.email_classification import EmailClassification
 
+# Fixed classification for blacklisted senders, before user rules are applied
+BLACKLISTED_CLASSIFICATION = {
+    'category': 'other',
+    'priority': 'low',
+    'urgency_score': 0.0,
+    'sentiment': 'neutral',
+    'requires_action': False,
+    'reasoning': 'Sender is blacklisted'
+}
+
 
 class CompleteTriageService:
-    def __init__(self):
-        self.triage_service = TriageService()
-        self.embedding_service = EmbeddingService()
-        self.confidence_service = ConfidenceService()
+    # Stateless and shared by every instance, so processing an email does
+    # not build new services (or API clients) each time
+    triage_service = TriageService()
+    # Concurrent process_email calls share classification requests
+    triage_batcher = TriageBatcher(triage_service)
+    embedding_service = EmbeddingService()
+    confidence_service = ConfidenceService()
 
-    async def process_email(self, email: Email, user_preferences: dict) -> dict:
-        """Complete triage pipeline for an email"""
+    async def process_email(self, email: Email, user_preferences: dict, db: Session) -> dict:
+        """Complete triage pipeline for an email, querying through the caller's session"""
 
         try:
-            # Step 1: AI Classification
-            ai_classification = self.triage_service.classify_email(
-                subject=email.subject or '',
-                body=email.body_text or '',
-                sender=email.sender_email or ''
-            )
+            # Read (and, for the deferred body, load) the fields here, so the
+            # worker threads below never touch the session
+            subject = email.subject or ''
+            body = email.body_text or ''
+            sender = email.sender_email or ''
+            embedding_content = self.embedding_service.email_content(email)
 
-            # Step 2: Apply user rules
+            rule_input = {'subject': subject, 'sender_email': sender, 'body': body}
             priority_engine = PriorityEngine(user_preferences)
-            final_classification = priority_engine.apply_custom_rules(
-                {
-                    'subject': email.subject or '',
-                    'sender_email': email.sender_email or '',
-                    'body': email.body_text or ''
-                },
-                ai_classification
+
+            # Blacklisted senders are settled by the user's own list: skip the
+            # classification, embedding and similarity search entirely and
+            # only apply the rules to a fixed low-priority classification
+            if sender in priority_engine.blacklist_senders:
+                return {
+                    'classification': priority_engine.apply_custom_rules(
+                        rule_input, dict(BLACKLISTED_CLASSIFICATION)
+                    ),
+                    'confidence': 1.0,
+                    'requires_review': False,
+                    'similar_emails': []
+                }
+
+            # Steps 1 and 3 are independent API calls, so the classification
+            # and the embedding are requested concurrently
+            ai_classification, embedding = await asyncio.gather(
+                # Step 1: AI Classification
+                self.triage_batcher.classify_email(
+                    subject=subject,
+                    body=body,
+                    sender=sender
+                ),
+                # Step 3: Generate embedding (from the content read above;
+                # the thread gets no ORM object)
+                asyncio.to_thread(self.embedding_service.generate_embedding, embedding_content)
             )
 
-            # Step 3: Generate embedding
-            embedding = self.embedding_service.embed_email(email)
+            # Step 2: Apply user rules
+            final_classification = priority_engine.apply_custom_rules(rule_input, ai_classification)
 
-            # Step 4: Find similar emails
-            email.embedding = embedding
-            similar_emails = self.embedding_service.find_similar_emails(str(email.id))
+            # Step 4: Find similar emails (unsaved emails have none yet)
+            # Emails store embeddings as halfvec
+            email.embedding = np.asarray(embedding, dtype=np.float16)
+            similar_emails = []
+            if email.id is not None:
+                # Make the new embedding visible to the similarity query
+                db.flush()
+                similar_emails = self.embedding_service.find_similar_emails(str(email.id), db)
 
             # Step 5: Calculate confidence
             confidence = self.confidence_service.calculate_confidence(
@@ -18,11 +18,9 @@ class ConfidenceService:
 
         # Boost confidence if similar emails have same classification
         if similar_emails:
-            matching_classifications = sum(
-                1 for email in similar_emails
-                if email.category == ai_classification['category']
-            )
-            similarity_boost = (matching_classifications / len(similar_emails)) * 0.1
+            categories = [email.category for email in similar_emails]
+            matching_classifications = categories.count(ai_classification['category'])
+            similarity_boost = (matching_classifications / len(categories)) * 0.1
             confidence += similarity_boost
 
         # Cap at 1.0
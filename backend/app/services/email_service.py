@@ -2,14 +2,45 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import base64
+from google_auth_httplib2 import AuthorizedHttp
+from concurrent.futures import ThreadPoolExecutor
+import binascii
+import httplib2
+from selectolax.parser import HTMLParser
+import random
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from email.utils import parsedate_to_datetime
+from email.utils import parseaddr, parsedate_to_datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Gmail accepts up to 100 calls per batch request but recommends no more
+# than 50 to avoid rate limiting
+GMAIL_BATCH_SIZE = 50
+GMAIL_MAX_CONCURRENT_BATCHES = 10  # ~50 messages.get/s, well under the per-user quota
+GMAIL_MAX_RETRIES = 5
+GMAIL_RETRYABLE_STATUSES = (429, 503)
+
+# base64url -> standard base64 alphabet, for decoding message bodies
+_B64_URLSAFE_TRANSLATE = bytes.maketrans(b'-_', b'+/')
+
+
+def _decode_body(data: str) -> str:
+    """Decode a Gmail base64url body to text (same result as urlsafe_b64decode + decode)"""
+    return binascii.a2b_base64(
+        data.encode('ascii').translate(_B64_URLSAFE_TRANSLATE)
+    ).decode('utf-8', errors='ignore')
+
+
+def _html_to_text(html: str) -> str:
+    """Extract the visible text of an HTML body, whitespace-separated"""
+    tree = HTMLParser(html)
+    tree.strip_tags(['script', 'style', 'head'])
+    node = tree.body or tree.root
+    return node.text(separator=' ', strip=True) if node else ''
+
 
 class EmailService:
     def __init__(self, user_credentials: dict):
@@ -50,25 +81,38 @@ class EmailService:
             if page_token:
                 request_params['pageToken'] = page_token
 
-            results = self.service.users().messages().list(**request_params).execute()
+            results = self._execute_with_retry(
+                self.service.users().messages().list(**request_params)
+            )
 
             messages = results.get('messages', [])
-            emails = []
-
-            for msg in messages:
-                try:
-                    email_data = self.service.users().messages().get(
-                        userId='me',
-                        id=msg['id'],
-                        format='full'
-                    ).execute()
-
-                    parsed_email = self._parse_email(email_data)
-                    if parsed_email:
-                        emails.append(parsed_email)
-                except HttpError as e:
-                    logger.error(f"Error fetching email {msg['id']}: {str(e)}")
-                    continue
+            parsed_emails = {}
+            pending_ids = [msg['id'] for msg in messages]
+
+            # Fetch message bodies with concurrent batch requests instead of
+            # one HTTP round trip per message. Messages rate limited inside
+            # a batch are retried in the next round after backing off.
+            for attempt in range(GMAIL_MAX_RETRIES + 1):
+                chunks = [
+                    pending_ids[start:start + GMAIL_BATCH_SIZE]
+                    for start in range(0, len(pending_ids), GMAIL_BATCH_SIZE)
+                ]
+                with ThreadPoolExecutor(max_workers=GMAIL_MAX_CONCURRENT_BATCHES) as executor:
+                    rate_limited = executor.map(
+                        lambda message_ids: self._fetch_batch(message_ids, parsed_emails),
+                        chunks
+                    )
+                    pending_ids = [message_id for ids in rate_limited for message_id in ids]
+
+                if not pending_ids:
+                    break
+                if attempt == GMAIL_MAX_RETRIES:
+                    logger.error(f"Giving up on {len(pending_ids)} rate limited emails")
+                    break
+                time.sleep(self._retry_delay(attempt))
+
+            # Batch callbacks can arrive in any order; keep the list order
+            emails = [parsed_emails[msg['id']] for msg in messages if msg['id'] in parsed_emails]
 
             return {
                 'emails': emails,
@@ -82,6 +126,73 @@ class EmailService:
             logger.error(f"Unexpected error: {str(e)}")
             raise Exception(f"Error fetching emails: {str(e)}")
 
+    def _fetch_batch(self, message_ids: List[str], parsed_emails: Dict[str, Any]) -> List[str]:
+        """
+        Fetch and parse one batch of messages
+
+        Args:
+            message_ids: Gmail message IDs, at most GMAIL_BATCH_SIZE
+            parsed_emails: Dict that parsed emails are stored in, keyed by message ID
+
+        Returns:
+            IDs of messages that were rate limited and should be retried
+        """
+        rate_limited = []
+
+        def handle_message(request_id, response, exception):
+            if exception is not None:
+                if isinstance(exception, HttpError) and exception.resp.status in GMAIL_RETRYABLE_STATUSES:
+                    rate_limited.append(request_id)
+                else:
+                    logger.error(f"Error fetching email {request_id}: {str(exception)}")
+                return
+
+            parsed_email = self._parse_email(response)
+            if parsed_email:
+                parsed_emails[request_id] = parsed_email
+
+        batch = self.service.new_batch_http_request(callback=handle_message)
+        for message_id in message_ids:
+            batch.add(
+                self.service.users().messages().get(
+                    userId='me',
+                    id=message_id,
+                    format='full'
+                ),
+                request_id=message_id
+            )
+
+        # httplib2 connections aren't thread-safe, so each batch gets its own
+        self._execute_with_retry(batch, http=AuthorizedHttp(self.credentials, http=httplib2.Http()))
+        return rate_limited
+
+    def _execute_with_retry(self, request, max_retries: int = GMAIL_MAX_RETRIES, **kwargs) -> Any:
+        """
+        Execute a Gmail API request, backing off when rate limited
+
+        Args:
+            request: HttpRequest or BatchHttpRequest
+            max_retries: Maximum number of retries on 429/503
+            **kwargs: Passed through to request.execute()
+
+        Returns:
+            Response of the request
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                return request.execute(**kwargs)
+            except HttpError as e:
+                if e.resp.status not in GMAIL_RETRYABLE_STATUSES or attempt == max_retries:
+                    raise
+                retry_after = e.resp.get('retry-after')
+                delay = int(retry_after) if retry_after and retry_after.isdigit() else self._retry_delay(attempt)
+                logger.warning(f"Gmail API returned {e.resp.status}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter, capped at 32 seconds"""
+        return min(2 ** attempt, 32) + random.random()
+
     def _parse_email(self, email_data: dict) -> Optional[Dict[str, Any]]:
         """
         Parse Gmail API response into structured format
@@ -106,20 +217,26 @@ class EmailService:
                 # Single part message
                 if 'body' in email_data['payload'] and 'data' in email_data['payload']['body']:
                     mime_type = email_data['payload'].get('mimeType', '')
-                    decoded_body = base64.urlsafe_b64decode(
-                        email_data['payload']['body']['data']
-                    ).decode('utf-8', errors='ignore')
+                    decoded_body = _decode_body(email_data['payload']['body']['data'])
 
                     if 'text/html' in mime_type:
                         body_html = decoded_body
                     else:
                         body_text = decoded_body
 
+            # HTML-only emails: store the stripped text once, so embedding
+            # and classification get content rather than markup or the snippet
+            if body_html and not body_text:
+                body_text = _html_to_text(body_html)
+
             # Parse sender
             sender_email, sender_name = self._parse_sender(headers.get('From', ''))
 
-            # Parse date
+            # Parse date, falling back to Gmail's internal timestamp so every
+            # email gets a stable received_at (the emails partition key)
             received_at = self._parse_date(headers.get('Date', ''))
+            if received_at is None and email_data.get('internalDate'):
+                received_at = datetime.utcfromtimestamp(int(email_data['internalDate']) / 1000)
 
             return {
                 'message_id': email_data['id'],
@@ -150,6 +267,10 @@ class EmailService:
         body_html = ""
 
         for part in parts:
+            # The first text and HTML bodies win, so stop once both are found
+            if body_text and body_html:
+                break
+
             mime_type = part.get('mimeType', '')
 
             # Handle nested parts (multipart)
@@ -159,16 +280,21 @@ class EmailService:
                 body_html = body_html or nested_html
                 continue
 
+            # Only decode bodies still missing; inline attachments and
+            # later alternatives are skipped without decoding
+            wanted = (
+                (mime_type == 'text/plain' and not body_text)
+                or (mime_type == 'text/html' and not body_html)
+            )
+
             # Extract body data
-            if 'body' in part and 'data' in part['body']:
+            if wanted and 'body' in part and 'data' in part['body']:
                 try:
-                    decoded_body = base64.urlsafe_b64decode(
-                        part['body']['data']
-                    ).decode('utf-8', errors='ignore')
+                    decoded_body = _decode_body(part['body']['data'])
 
-                    if mime_type == 'text/plain' and not body_text:
+                    if mime_type == 'text/plain':
                         body_text = decoded_body
-                    elif mime_type == 'text/html' and not body_html:
+                    else:
                         body_html = decoded_body
 
                 except Exception as e:
@@ -187,16 +313,10 @@ class EmailService:
         Returns:
             Tuple of (email, name)
         """
-        try:
-            # Format: "Name <email@example.com>" or "email@example.com"
-            if '<' in from_header and '>' in from_header:
-                name = from_header.split('<')[0].strip().strip('"')
-                email = from_header.split('<')[1].split('>')[0].strip()
-                return email, name
-            else:
-                return from_header.strip(), ""
-        except Exception:
-            return from_header, ""
+        # Handles "Name <email@example.com>", bare addresses, quoted names
+        # and comments; keep the raw header if it can't be parsed at all
+        name, email = parseaddr(from_header)
+        return email or from_header.strip(), name
 
     def _parse_date(self, date_header: str) -> Optional[datetime]:
         """
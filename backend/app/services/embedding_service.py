@@ -1,57 +1,200 @@
+"""
+Embedding generation and vector similarity search.
+
+All kNN queries against emails.embedding must keep the exact shape
+
+    SELECT ... FROM emails WHERE user_id = :uid
+    ORDER BY embedding <=> :q LIMIT :k
+
+i.e. order by the raw cosine distance operator, ascending, with no wrapping
+expression (no `1 - (embedding <=> :q)`, no DESC). Any other form makes
+Postgres skip the HNSW index (idx_emails_embedding) and fall back to a
+sequential scan over every embedding.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 from openai import OpenAI
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
 from app.models.email import Email
-from app.core.database import SessionLocal
 from app.core.config import settings
+from app.core.redis_client import get_sync_redis
+from app.services.openai_client import get_openai_client
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Embeddings are cached by a hash of the whitespace-normalized input text,
+# as float16 (what emails.embedding stores anyway). The prefix names the
+# model and the encoding, so changing either must change it too.
+EMBEDDING_CACHE_PREFIX = "emb:v3s:f16:"
+EMBEDDING_CACHE_TTL = 30 * 86400  # 30 days
+
+# Inputs per embeddings request. Each input is capped at 8000 characters,
+# so this stays under the API's per-request token limit.
+EMBEDDING_BATCH_SIZE = 100
+
+# In-process LRU in front of Redis, for content re-embedded within one
+# worker's lifetime. float16 arrays: ~3 KB each, ~12 MB when full.
+EMBEDDING_LOCAL_CACHE_SIZE = 4096
+
+_local_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def _local_cache_get(key: str):
+    """Return the cached vector for key (marking it recently used), or None"""
+    with _local_cache_lock:
+        vector = _local_cache.get(key)
+        if vector is not None:
+            _local_cache.move_to_end(key)
+        return vector
+
+
+def _local_cache_put(key: str, vector: np.ndarray) -> None:
+    """Cache a vector, evicting the least recently used one when full"""
+    with _local_cache_lock:
+        _local_cache[key] = vector
+        _local_cache.move_to_end(key)
+        if len(_local_cache) > EMBEDDING_LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
 
 
 class EmbeddingService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.redis = get_sync_redis()
+
+    @property
+    def client(self) -> OpenAI:
+        """OpenAI client, looked up on each use rather than kept from __init__ (see get_openai_client)"""
+        return get_openai_client()
 
     def generate_embedding(self, text: str) -> list[float]:
-        """Generate embedding vector for text"""
-        try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text[:8000]  # Limit text length
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            # Return empty embedding on error
-            return [0.0] * 1536
-
-    def embed_email(self, email: Email) -> list[float]:
+        """Generate embedding vector for text, reusing cached vectors for repeated content"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Generate embedding vectors for many texts with as few API calls as possible
+
+        Vectors are looked up in the in-process LRU, then in Redis with a
+        single MGET; the rest are requested from OpenAI in chunks of
+        EMBEDDING_BATCH_SIZE inputs per call.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text, in input order. Texts whose request failed
+            get an all-zero vector, which is not cached.
+        """
+        # Collapse whitespace runs so re-wrapped or re-indented copies of the
+        # same content (quoted replies, forwards) share a cache entry
+        texts = [' '.join(text.split())[:8000] for text in texts]  # Limit text length
+        cache_keys = [
+            EMBEDDING_CACHE_PREFIX + hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+            for text in texts
+        ]
+        embeddings = [None] * len(texts)
+
+        for i, key in enumerate(cache_keys):
+            vector = _local_cache_get(key)
+            if vector is not None:
+                embeddings[i] = vector.tolist()
+
+        uncached = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if uncached:
+            try:
+                for i, cached in zip(uncached, self.redis.mget([cache_keys[i] for i in uncached])):
+                    if cached:
+                        vector = np.frombuffer(cached, dtype=np.float16)
+                        _local_cache_put(cache_keys[i], vector)
+                        embeddings[i] = vector.tolist()
+            except Exception:
+                # Cache is best effort; fall through to OpenAI
+                pass
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        fetched = {}
+
+        for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+            chunk = missing[start:start + EMBEDDING_BATCH_SIZE]
+            try:
+                response = self.client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=[texts[i] for i in chunk]
+                )
+            except Exception as e:
+                # Leave these as empty embeddings
+                continue
+            for i, item in zip(chunk, response.data):
+                # Round to float16 now, so cached and fresh results match
+                fetched[i] = np.asarray(item.embedding, dtype=np.float16)
+                embeddings[i] = fetched[i].tolist()
+
+        if fetched:
+            for i, vector in fetched.items():
+                _local_cache_put(cache_keys[i], vector)
+            try:
+                pipeline = self.redis.pipeline(transaction=False)
+                for i, vector in fetched.items():
+                    # float16 bytes: 3 KB per vector instead of a JSON float list
+                    pipeline.setex(cache_keys[i], EMBEDDING_CACHE_TTL, vector.tobytes())
+                pipeline.execute()
+            except Exception:
+                pass
+
+        return [embedding if embedding is not None else [0.0] * 1536 for embedding in embeddings]
+
+    @staticmethod
+    def email_content(email: Email) -> str:
+        """Text embedded for an email: subject plus the start of the body"""
+        return f"{email.subject} {email.body_text[:1000] if email.body_text else ''}"
+
+    def embed_email(self, email: Email) -> np.ndarray:
         """Generate embedding for email content"""
-        # Combine subject and body for embedding
-        content = f"{email.subject} {email.body_text[:1000] if email.body_text else ''}"
-        return self.generate_embedding(content)
-
-    def find_similar_emails(self, email_id: str, limit: int = 5) -> list:
-        """Find similar emails using vector similarity"""
-        db = SessionLocal()
-
-        try:
-            # Get target email
-            target_email = db.query(Email).filter(Email.id == email_id).first()
-
-            if not target_email or target_email.embedding is None:
-                return []
-
-            # Find similar emails using cosine distance
-            # pgvector uses <=> operator for cosine distance in raw SQL
-            # In SQLAlchemy, we use the l2_distance function and filter for non-null embeddings
-            similar_emails = db.query(Email).filter(
-                Email.id != email_id,
-                Email.embedding.isnot(None)
-            ).order_by(
-                Email.embedding.cosine_distance(target_email.embedding)
-            ).limit(limit).all()
+        # Emails store embeddings as halfvec, so cast once here
+        return np.asarray(self.generate_embedding(self.email_content(email)), dtype=np.float16)
 
-            return similar_emails
+    def find_similar_emails(self, email_id: str, db: Session, limit: int = 5) -> list:
+        """
+        Find similar emails using vector similarity, in a single query on the caller's session
+
+        Runs inside a savepoint, so a failed query (e.g. a setting the
+        installed pgvector doesn't know) is rolled back without aborting the
+        caller's transaction, and the error is raised to the caller.
+        """
+        with db.begin_nested():
+            # Tune HNSW recall for this transaction only
+            hnsw_settings = [func.set_config('hnsw.ef_search', str(settings.HNSW_EF_SEARCH), True)]
+            if settings.HNSW_ITERATIVE_SCAN:
+                # Without it the index returns ef_search candidates across all
+                # users, and the user_id filter can leave fewer than `limit`
+                hnsw_settings.append(func.set_config('hnsw.iterative_scan', settings.HNSW_ITERATIVE_SCAN, True))
+            db.execute(select(*hnsw_settings))
 
-        except Exception as e:
-            # Return empty list on error
-            return []
-        finally:
-            db.close()
+            # The target is looked up in a CTE and read through scalar
+            # subqueries, which Postgres evaluates once as constants, so
+            # `embedding <=> (target embedding)` can still use the HNSW index
+            target = select(Email.user_id, Email.embedding).where(Email.id == email_id).cte('target')
+            target_user_id = select(target.c.user_id).scalar_subquery()
+            target_embedding = select(target.c.embedding).scalar_subquery()
+
+            # cosine_distance() compiles to `embedding <=> :q`; keep it as the
+            # bare ORDER BY key (ascending) so the HNSW index is used.
+            # Plain rows (attribute access: row.id, row.category, ...) rather
+            # than ORM objects, as callers only read these columns
+            similar_emails = db.execute(
+                select(Email.id, Email.received_at, Email.subject, Email.category, Email.priority)
+                .where(
+                    Email.user_id == target_user_id,
+                    Email.id != email_id,
+                    Email.embedding.isnot(None),
+                    target_embedding.isnot(None)
+                )
+                .order_by(Email.embedding.cosine_distance(target_embedding))
+                .limit(limit)
+            ).all()
+
+            return similar_emails
@@ -0,0 +1,37 @@
+import os
+import httpx
+from openai import OpenAI
+from app.core.config import settings
+
+# Connections kept open to the OpenAI API per process. Over HTTP/2 each
+# connection also multiplexes concurrent requests.
+OPENAI_MAX_CONNECTIONS = 50
+
+openai_client = None
+# Process that built openai_client
+openai_client_pid = None
+
+
+def get_openai_client() -> OpenAI:
+    """
+    Get the process-wide OpenAI client
+
+    Shared by every service so they reuse one HTTP/2 connection pool
+    instead of opening one per service instance. A client inherited through
+    fork (e.g. built in the Celery master before the pool starts) would
+    share its connections with the parent, so each process builds its own.
+    """
+    global openai_client, openai_client_pid
+    if openai_client is None or openai_client_pid != os.getpid():
+        openai_client_pid = os.getpid()
+        openai_client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=httpx.Client(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                )
+            )
+        )
+    return openai_client
@@ -1,53 +1,109 @@
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional
 import re
 
 
+PRIORITY_KEYWORDS = {
+    'urgent': ['urgent', 'asap', 'immediate', 'critical', 'emergency'],
+    'high': ['important', 'priority', 'deadline', 'today'],
+    'medium': ['please review', 'feedback', 'update'],
+    'low': ['fyi', 'newsletter', 'notification']
+}
+
+PRIORITY_LEVELS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+# Keyword -> priority, matched in a single pass over the subject. The
+# alternation is wrapped in a lookahead so every keyword occurrence is
+# reported, including ones overlapping another keyword (substring semantics,
+# same as `kw in subject`).
+_KEYWORD_PRIORITY = {
+    kw: priority
+    for priority, keywords in PRIORITY_KEYWORDS.items()
+    for kw in keywords
+}
+_KEYWORD_PATTERN = re.compile(
+    '(?=(' + '|'.join(
+        re.escape(kw) for kw in sorted(_KEYWORD_PRIORITY, key=len, reverse=True)
+    ) + '))'
+)
+
+
+@lru_cache(maxsize=256)
+def _compile_rule_pattern(pattern: str) -> re.Pattern:
+    """Compile a user rule's sender pattern once per distinct pattern"""
+    return re.compile(pattern)
+
+
 class PriorityEngine:
+    priority_keywords = PRIORITY_KEYWORDS
+
     def __init__(self, user_preferences: dict):
         self.preferences = user_preferences
-        self.priority_keywords = {
-            'urgent': ['urgent', 'asap', 'immediate', 'critical', 'emergency'],
-            'high': ['important', 'priority', 'deadline', 'today'],
-            'medium': ['please review', 'feedback', 'update'],
-            'low': ['fyi', 'newsletter', 'notification']
-        }
+
+        # Compile the preferences once per engine: set lookups for sender
+        # lists, and each rule's regex and lowercased substring up front
+        self.whitelist_senders = frozenset(user_preferences.get('whitelist_senders', []))
+        self.blacklist_senders = frozenset(user_preferences.get('blacklist_senders', []))
+        self.compiled_rules = [
+            self._compile_rule(rule) for rule in user_preferences.get('priority_rules', [])
+        ]
 
     def apply_custom_rules(self, email: dict, ai_classification: dict) -> dict:
         """Apply user-defined rules to override or adjust AI classification"""
+        subject_lower = email['subject'].lower()
 
         # Check whitelist/blacklist
-        if email['sender_email'] in self.preferences.get('whitelist_senders', []):
+        if email['sender_email'] in self.whitelist_senders:
             ai_classification['priority'] = 'high'
 
-        if email['sender_email'] in self.preferences.get('blacklist_senders', []):
+        if email['sender_email'] in self.blacklist_senders:
             ai_classification['priority'] = 'low'
 
         # Apply custom priority rules
-        custom_rules = self.preferences.get('priority_rules', [])
-        for rule in custom_rules:
-            if self._matches_rule(email, rule):
+        for compiled_rule in self.compiled_rules:
+            if self._matches_rule(email['sender_email'], subject_lower, compiled_rule):
+                rule = compiled_rule[2]
                 ai_classification['priority'] = rule['priority']
                 ai_classification['category'] = rule.get('category', ai_classification['category'])
 
         # Keyword-based priority boost
-        subject_lower = email['subject'].lower()
-        for priority, keywords in self.priority_keywords.items():
-            if any(kw in subject_lower for kw in keywords):
-                if self._priority_level(priority) > self._priority_level(ai_classification['priority']):
-                    ai_classification['priority'] = priority
+        keyword_priority = self._keyword_priority(subject_lower)
+        if keyword_priority:
+            if self._priority_level(keyword_priority) > self._priority_level(ai_classification['priority']):
+                ai_classification['priority'] = keyword_priority
 
         return ai_classification
 
-    def _matches_rule(self, email: dict, rule: dict) -> bool:
-        """Check if email matches custom rule conditions"""
+    def _keyword_priority(self, subject_lower: str) -> Optional[str]:
+        """Return the highest priority whose keywords appear in the (lowercased) subject"""
+        priorities = {
+            _KEYWORD_PRIORITY[match.group(1)]
+            for match in _KEYWORD_PATTERN.finditer(subject_lower)
+        }
+        return max(priorities, key=self._priority_level, default=None)
+
+    def _compile_rule(self, rule: dict) -> Optional[tuple]:
+        """Precompile a rule into (sender regex, lowercased subject substring, rule)"""
+        try:
+            sender_regex = _compile_rule_pattern(rule['sender_pattern']) if 'sender_pattern' in rule else None
+            subject_contains = rule['subject_contains'].lower() if 'subject_contains' in rule else None
+            return sender_regex, subject_contains, rule
+        except Exception as e:
+            # Invalid rules never match
+            return None
+
+    def _matches_rule(self, sender_email: str, subject_lower: str, compiled_rule: Optional[tuple]) -> bool:
+        """Check if email matches compiled rule conditions"""
+        if compiled_rule is None:
+            return False
+
+        sender_regex, subject_contains, _ = compiled_rule
         try:
-            if 'sender_pattern' in rule:
-                if not re.search(rule['sender_pattern'], email['sender_email']):
-                    return False
+            if sender_regex is not None and not sender_regex.search(sender_email):
+                return False
 
-            if 'subject_contains' in rule:
-                if rule['subject_contains'].lower() not in email['subject'].lower():
-                    return False
+            if subject_contains is not None and subject_contains not in subject_lower:
+                return False
 
             return True
         except Exception as e:
@@ -56,5 +112,4 @@ class PriorityEngine:
 
     def _priority_level(self, priority: str) -> int:
         """Convert priority to numeric level for comparison"""
-        levels = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
-        return levels.get(priority, 2)
+        return PRIORITY_LEVELS.get(priority, 2)
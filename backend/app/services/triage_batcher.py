@@ -0,0 +1,96 @@
+"""
+Micro-batching of concurrent classification requests.
+
+Callers await classify_email() as if it were a single request. Requests
+arriving within max_wait_ms of each other (up to max_batch_size) are
+coalesced into one TriageService.classify_batch() call, i.e. one OpenAI
+round trip, and each caller gets its own result back through a future.
+
+Pending requests are kept per event loop, so one batcher can be shared by
+code that runs several loops in turn (e.g. asyncio.run() per Celery task)
+or concurrently in different threads.
+"""
+import asyncio
+import weakref
+from typing import Optional
+from app.services.triage_service import TriageService
+
+TRIAGE_MAX_BATCH_SIZE = 16
+TRIAGE_MAX_WAIT_MS = 10
+
+
+class _LoopBatch:
+    """Requests queued on one event loop, and the timer that will flush them"""
+
+    def __init__(self):
+        self.pending: list[tuple[dict, asyncio.Future]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        # Strong references to in-flight batches, so they aren't garbage collected
+        self.tasks: set[asyncio.Task] = set()
+
+
+class TriageBatcher:
+    def __init__(
+        self,
+        triage_service: Optional[TriageService] = None,
+        max_batch_size: int = TRIAGE_MAX_BATCH_SIZE,
+        max_wait_ms: int = TRIAGE_MAX_WAIT_MS
+    ):
+        self.triage_service = triage_service or TriageService()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Dropped together with their loop once it is closed and collected
+        self._batches: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def classify_email(self, subject: str, body: str, sender: str) -> dict:
+        """Classify an email, sharing an OpenAI request with concurrent callers"""
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = self._batches[loop] = _LoopBatch()
+
+        future = loop.create_future()
+        batch.pending.append(({'subject': subject, 'body': body, 'sender': sender}, future))
+
+        if len(batch.pending) >= self.max_batch_size:
+            self._flush(loop, batch)
+        elif batch.flush_handle is None:
+            batch.flush_handle = loop.call_later(self.max_wait, self._flush, loop, batch)
+
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, batch: _LoopBatch) -> None:
+        """Send everything queued so far on this loop as one batch"""
+        if batch.flush_handle is not None:
+            batch.flush_handle.cancel()
+            batch.flush_handle = None
+
+        # Callers that were cancelled (or timed out) while queued get nothing
+        requests = [(email, future) for email, future in batch.pending if not future.done()]
+        batch.pending = []
+        if requests:
+            task = loop.create_task(self._run_batch(requests))
+            batch.tasks.add(task)
+            task.add_done_callback(batch.tasks.discard)
+
+    async def _run_batch(self, requests: list[tuple[dict, asyncio.Future]]) -> None:
+        """Classify a batch off the event loop and resolve each caller's future"""
+        try:
+            results = await asyncio.to_thread(
+                self.triage_service.classify_batch,
+                [email for email, _ in requests]
+            )
+        except asyncio.CancelledError:
+            # Loop shutting down: don't leave callers waiting forever
+            for _, future in requests:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(requests, results):
+            if not future.done():
+                future.set_result(result)
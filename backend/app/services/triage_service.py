@@ -1,59 +1,116 @@
-from openai import OpenAI
+import hashlib
 import json
+import textwrap
+from openai import OpenAI
 from app.core.config import settings
+from app.core.redis_client import get_sync_redis
+from app.schemas.email import AIClassification, AIClassificationBatch
+from app.services.openai_client import get_openai_client
+
+# Classifications are cached by a hash of the model and the exact prompt
+# inputs, so recurring templates (newsletters, notifications, auto-replies)
+# skip the chat completion
+CLASSIFICATION_CACHE_PREFIX = "cls:"
+CLASSIFICATION_CACHE_TTL = 7 * 86400  # 7 days
+
+# Structured outputs: the model is constrained to exactly this schema, so
+# the response always parses and needs no per-field fallbacks. Built once
+# at import rather than per request.
+CLASSIFICATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "email_classification",
+        "strict": True,
+        "schema": AIClassification.model_json_schema()
+    }
+}
+
+BATCH_CLASSIFICATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "email_classification_batch",
+        "strict": True,
+        "schema": AIClassificationBatch.model_json_schema()
+    }
+}
+
+SYSTEM_MESSAGE = {"role": "system", "content": "You are an email classification expert."}
+
+# Dedented once here: the source indentation would otherwise be sent (and
+# billed) as prompt tokens on every request
+CLASSIFICATION_PROMPT = textwrap.dedent("""\
+    Analyze the following email and provide classification:
+
+    Subject: {subject}
+    From: {sender}
+    Body: {body}
+
+    Provide the following classifications:
+    1. Category (work, personal, marketing, support, finance, other)
+    2. Priority (urgent, high, medium, low)
+    3. Urgency Score (0.0 to 1.0)
+    4. Sentiment (positive, neutral, negative)
+    5. Requires Action (true/false)
+    6. Reasoning (brief explanation)
+""")
+
+BATCH_CLASSIFICATION_PROMPT = textwrap.dedent("""\
+    Classify each email in the following JSON array (subject, sender, body).
+    Return one classification per email, in the same order.
+
+    For each email provide:
+    1. Category (work, personal, marketing, support, finance, other)
+    2. Priority (urgent, high, medium, low)
+    3. Urgency Score (0.0 to 1.0)
+    4. Sentiment (positive, neutral, negative)
+    5. Requires Action (true/false)
+    6. Reasoning (brief explanation)
+
+    Emails:
+""")
 
 
 class TriageService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.classification_prompt = """
-        Analyze the following email and provide classification:
-
-        Subject: {subject}
-        From: {sender}
-        Body: {body}
-
-        Provide the following classifications:
-        1. Category (work, personal, marketing, support, finance, other)
-        2. Priority (urgent, high, medium, low)
-        3. Urgency Score (0.0 to 1.0)
-        4. Sentiment (positive, neutral, negative)
-        5. Requires Action (true/false)
-        6. Reasoning (brief explanation)
-
-        Respond in JSON format.
-        """
+        self.redis = get_sync_redis()
+        self.classification_prompt = CLASSIFICATION_PROMPT
+
+    @property
+    def client(self) -> OpenAI:
+        """Shared OpenAI client of the current process"""
+        return get_openai_client()
 
     def classify_email(self, subject: str, body: str, sender: str) -> dict:
-        """Use OpenAI to classify email"""
+        """Use OpenAI to classify email, reusing cached results for repeated content"""
+
+        body = body[:1000]  # Limit body length
+        cache_key = self._cache_key(subject, body, sender)
 
-        prompt = self.classification_prompt.format(
-            subject=subject,
-            sender=sender,
-            body=body[:1000]  # Limit body length
-        )
+        try:
+            cached = self.redis.get(cache_key)
+            if cached:
+                return json.loads(cached)
+        except Exception:
+            # Cache is best effort; fall through to OpenAI
+            pass
+
+        prompt = self.classification_prompt.format_map({
+            'subject': subject,
+            'sender': sender,
+            'body': body
+        })
 
         try:
             response = self.client.chat.completions.create(
                 model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are an email classification expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
+                messages=[SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+                response_format=CLASSIFICATION_RESPONSE_FORMAT,
                 temperature=0.3
             )
 
-            classification = json.loads(response.choices[0].message.content)
-
-            return {
-                'category': classification.get('category', 'other'),
-                'priority': classification.get('priority', 'medium'),
-                'urgency_score': float(classification.get('urgency_score', 0.5)),
-                'sentiment': classification.get('sentiment', 'neutral'),
-                'requires_action': classification.get('requires_action', False),
-                'reasoning': classification.get('reasoning', '')
-            }
+            result = AIClassification.model_validate_json(
+                response.choices[0].message.content
+            ).model_dump()
         except Exception as e:
             # Return default classification on error
             return {
@@ -65,14 +122,87 @@ class TriageService:
                 'reasoning': f'Classification failed: {str(e)}'
             }
 
-    def generate_embedding(self, text: str) -> list[float]:
-        """Generate embedding for semantic search"""
+        # Failures above return early, so only real classifications are cached
+        self._cache_results({cache_key: result})
+
+        return result
+
+    def classify_batch(self, emails: list[dict]) -> list[dict]:
+        """
+        Classify several emails with a single OpenAI request
+
+        Cached classifications are read with one MGET; the rest are sent
+        together as a JSON array and answered with one structured list.
+
+        Args:
+            emails: Dicts with subject, body and sender
+
+        Returns:
+            One classification per email, in input order. If the batched
+            request fails or returns the wrong number of results, those
+            emails are classified one by one instead.
+        """
+        emails = [
+            {'subject': email['subject'], 'sender': email['sender'], 'body': email['body'][:1000]}
+            for email in emails
+        ]
+        cache_keys = [self._cache_key(email['subject'], email['body'], email['sender']) for email in emails]
+        results = [None] * len(emails)
+
+        try:
+            for i, cached in enumerate(self.redis.mget(cache_keys)):
+                if cached:
+                    results[i] = json.loads(cached)
+        except Exception:
+            pass
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if len(missing) == 1:
+            results[missing[0]] = self.classify_email(**emails[missing[0]])
+        if len(missing) <= 1:
+            return results
+
         try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
+            response = self.client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[
+                    SYSTEM_MESSAGE,
+                    {"role": "user", "content": BATCH_CLASSIFICATION_PROMPT + json.dumps([emails[i] for i in missing])}
+                ],
+                response_format=BATCH_CLASSIFICATION_RESPONSE_FORMAT,
+                temperature=0.3
             )
-            return response.data[0].embedding
-        except Exception as e:
-            # Return empty embedding on error
-            return [0.0] * 1536
+
+            classifications = AIClassificationBatch.model_validate_json(
+                response.choices[0].message.content
+            ).classifications
+            if len(classifications) != len(missing):
+                raise ValueError(f"Expected {len(missing)} classifications, got {len(classifications)}")
+
+            fetched = {}
+            for i, classification in zip(missing, classifications):
+                results[i] = fetched[cache_keys[i]] = classification.model_dump()
+            self._cache_results(fetched)
+
+        except Exception:
+            # Fall back to one request per email
+            for i in missing:
+                results[i] = self.classify_email(**emails[i])
+
+        return results
+
+    def _cache_key(self, subject: str, body: str, sender: str) -> str:
+        """Cache key for a classification of the (already truncated) inputs"""
+        return CLASSIFICATION_CACHE_PREFIX + hashlib.sha256(
+            f"{settings.OPENAI_MODEL}|{sender}|{subject[:200]}|{body}".encode()
+        ).hexdigest()
+
+    def _cache_results(self, results: dict) -> None:
+        """Store classifications by cache key; best effort"""
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for cache_key, result in results.items():
+                pipeline.setex(cache_key, CLASSIFICATION_CACHE_TTL, json.dumps(result))
+            pipeline.execute()
+        except Exception:
+            pass
@@ -1,23 +1,11 @@
-from celery import Celery
-from app.core.config import settings
+"""
+Celery app for the tasks in app.workers.tasks.
 
-celery_app = Celery(
-    "email_triage_worker",
-    broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL,
-    include=["app.workers.tasks"]
-)
-
-celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
-    timezone="UTC",
-    enable_utc=True,
-    task_track_started=True,
-    task_time_limit=30 * 60,  # 30 minutes
-    task_soft_time_limit=25 * 60,  # 25 minutes
-)
+An alias of app.celery_app, so `celery -A app.workers.celery_app` keeps
+working and these tasks are consumed by the same workers (and routed,
+configured and warmed up the same way) as the rest of app.workers.
+"""
+from app.celery_app import celery_app
 
 if __name__ == "__main__":
     celery_app.start()
@@ -1,30 +1,92 @@
-from celery import Task
+from celery import Task, group
+from sqlalchemy import text
+from sqlalchemy.orm import load_only
 from app.celery_app import celery_app
 from app.models.email import Email
-from app.core.database import SessionLocal
+from app.core.bulk_copy import copy_to_temp_table
+from app.core.database import ScopedSession
+from app.services.embedding_service import EmbeddingService
 from datetime import datetime
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Shared by all tasks in this worker process
+embedding_service = EmbeddingService()
+
+# Emails handled per process_email_chunk task: one query, one embeddings
+# request and one UPDATE per chunk
+PROCESS_CHUNK_SIZE = 100
+
 
 class DatabaseTask(Task):
     """Base task with database session management"""
-    _db = None
 
     @property
     def db(self):
-        if self._db is None:
-            self._db = SessionLocal()
-        return self._db
+        # The calling thread's session, shared by everything the task runs
+        return ScopedSession()
 
     def after_return(self, *args, **kwargs):
-        if self._db is not None:
-            self._db.close()
-            self._db = None
+        # Close the session, returning its connection to the engine's pool
+        ScopedSession.remove()
 
 
-@celery_app.task(base=DatabaseTask, bind=True, max_retries=3)
+def _load_emails_for_embedding(db, email_ids: list) -> list:
+    """
+    Load the emails to embed with one query
+
+    body_text is deferred on the model; naming it in load_only loads it in
+    this same SELECT (body_html stays unloaded), so embedding a chunk doesn't
+    issue one lazy load per email.
+
+    Args:
+        db: Database session
+        email_ids: List of email UUIDs
+
+    Returns:
+        Emails with id, received_at, subject and body_text loaded
+    """
+    return db.query(Email).options(
+        load_only(Email.id, Email.received_at, Email.subject, Email.body_text)
+    ).filter(Email.id.in_(email_ids)).all()
+
+
+def _store_embeddings(db, emails: list) -> int:
+    """
+    Embed emails with batched API calls and write the vectors with one COPY and one UPDATE
+
+    Args:
+        db: Database session (the caller commits)
+        emails: Emails with id, received_at, subject and body_text loaded
+
+    Returns:
+        Number of emails whose embedding was stored
+    """
+    embeddings = embedding_service.embed_batch(
+        [embedding_service.email_content(email) for email in emails]
+    )
+
+    # Skip failed (all-zero) embeddings; they have no cosine direction
+    rows = [
+        (email.id, email.received_at, np.asarray(embedding, dtype=np.float16))
+        for email, embedding in zip(emails, embeddings)
+        if any(embedding)
+    ]
+
+    copy_to_temp_table(db, 'email_embeddings_staging', 'emails', ['id', 'received_at', 'embedding'], rows)
+    db.execute(text("""
+        UPDATE emails
+        SET embedding = staged.embedding
+        FROM email_embeddings_staging AS staged
+        WHERE emails.id = staged.id
+          AND emails.received_at = staged.received_at
+    """))
+    return len(rows)
+
+
+@celery_app.task(base=DatabaseTask, bind=True, max_retries=3, ignore_result=True)
 def process_email(self, email_id: str):
     """
     Background task to process and classify email
@@ -35,7 +97,7 @@ def process_email(self, email_id: str):
     Returns:
         Dict with processing status
     """
-    db = SessionLocal()
+    db = self.db
 
     try:
         email = db.query(Email).filter(Email.id == email_id).first()
@@ -79,8 +141,83 @@ def process_email(self, email_id: str):
         # Retry with exponential backoff
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
-    finally:
-        db.close()
+
+@celery_app.task(base=DatabaseTask, bind=True, max_retries=3, ignore_result=True)
+def batch_embed_emails(self, email_ids: list):
+    """
+    Generate and store embeddings for many emails with batched API calls
+
+    Args:
+        email_ids: List of email UUIDs to embed
+
+    Returns:
+        Dict with embedding results
+    """
+    db = self.db
+
+    try:
+        emails = _load_emails_for_embedding(db, email_ids)
+
+        embedded = _store_embeddings(db, emails)
+        db.commit()
+
+        logger.info(f"Embedded {embedded}/{len(email_ids)} emails")
+        return {
+            'status': 'success',
+            'total': len(email_ids),
+            'embedded': embedded
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error embedding batch of {len(email_ids)} emails: {str(e)}")
+
+        # Retry with exponential backoff
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+@celery_app.task(base=DatabaseTask, bind=True, max_retries=3, ignore_result=True)
+def process_email_chunk(self, email_ids: list):
+    """
+    Process a chunk of emails in one task: embed them and mark them processed
+
+    All rows are loaded with a single query, embedded with batched API
+    calls, and written back with set-based UPDATEs, instead of one task,
+    query and API call per email.
+
+    Args:
+        email_ids: List of email UUIDs to process
+
+    Returns:
+        Dict with chunk processing results
+    """
+    db = self.db
+
+    try:
+        emails = _load_emails_for_embedding(db, email_ids)
+
+        embedded = _store_embeddings(db, emails)
+
+        db.query(Email).filter(
+            Email.id.in_([email.id for email in emails])
+        ).update({Email.processed_at: datetime.utcnow()}, synchronize_session=False)
+
+        db.commit()
+
+        logger.info(f"Processed chunk of {len(emails)} emails ({embedded} embedded)")
+        return {
+            'status': 'processed',
+            'total': len(email_ids),
+            'processed': len(emails),
+            'embedded': embedded
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error processing chunk of {len(email_ids)} emails: {str(e)}")
+
+        # Retry with exponential backoff
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
 
 @celery_app.task(base=DatabaseTask, bind=True, max_retries=3)
@@ -101,16 +238,19 @@ def batch_process_emails(self, email_ids: list):
         'errors': []
     }
 
-    for email_id in email_ids:
-        try:
-            result = process_email.delay(str(email_id))
-            results['successful'] += 1
-        except Exception as e:
-            results['failed'] += 1
-            results['errors'].append({
-                'email_id': str(email_id),
-                'error': str(e)
-            })
-            logger.error(f"Failed to queue email {email_id}: {str(e)}")
+    try:
+        email_ids = [str(email_id) for email_id in email_ids]
+
+        # One task per chunk rather than per email, published in one go
+        # over a single producer connection
+        group(
+            process_email_chunk.s(email_ids[start:start + PROCESS_CHUNK_SIZE])
+            for start in range(0, len(email_ids), PROCESS_CHUNK_SIZE)
+        ).apply_async()
+        results['successful'] = len(email_ids)
+    except Exception as e:
+        results['failed'] = len(email_ids)
+        results['errors'].append({'error': str(e)})
+        logger.error(f"Failed to queue batch of {len(email_ids)} emails: {str(e)}")
 
     return results
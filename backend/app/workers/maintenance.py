@@ -0,0 +1,58 @@
+from sqlalchemy import text
+from app.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(ignore_result=True)
+def maintain_email_partitions():
+    """
+    Periodic task to manage the monthly partitions of the emails table
+
+    Precreates the current and upcoming monthly partitions and drops whole
+    partitions that fall outside the retention window, instead of deleting
+    old rows one by one.
+
+    Returns:
+        Dict with maintenance results
+    """
+    db = SessionLocal()
+
+    try:
+        for months_ahead in range(settings.EMAIL_PARTITIONS_AHEAD + 1):
+            db.execute(
+                text("""
+                    SELECT create_emails_partition(
+                        (date_trunc('month', CURRENT_DATE) + make_interval(months => :months))::DATE
+                    )
+                """),
+                {'months': months_ahead}
+            )
+
+        dropped = db.execute(
+            text("""
+                SELECT drop_emails_partitions_before(
+                    (date_trunc('month', CURRENT_DATE) - make_interval(months => :months))::DATE
+                )
+            """),
+            {'months': settings.EMAIL_RETENTION_MONTHS}
+        ).scalar()
+
+        db.commit()
+
+        logger.info(f"Email partitions maintained, dropped {dropped} expired partitions")
+        return {
+            'status': 'success',
+            'partitions_dropped': dropped
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error maintaining email partitions: {str(e)}")
+        raise
+
+    finally:
+        db.close()
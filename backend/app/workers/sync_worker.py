@@ -1,34 +1,33 @@
-from celery import Task
+from celery import group
+from sqlalchemy import text
+from sqlalchemy.orm import load_only
 from app.celery_app import celery_app
 from app.services.email_service import EmailService
-from app.models.email import Email
 from app.models.user import User
-from app.core.database import SessionLocal
+from app.core.bulk_copy import copy_to_temp_table
 from app.core.config import settings
-from app.workers.email_processor import process_email
+from app.workers.email_processor import DatabaseTask, process_email
 from datetime import datetime
+from uuid6 import uuid7
 import logging
 
 logger = logging.getLogger(__name__)
 
-
-class DatabaseTask(Task):
-    """Base task with database session management"""
-    _db = None
-
-    @property
-    def db(self):
-        if self._db is None:
-            self._db = SessionLocal()
-        return self._db
-
-    def after_return(self, *args, **kwargs):
-        if self._db is not None:
-            self._db.close()
-            self._db = None
-
-
-@celery_app.task(base=DatabaseTask, bind=True, max_retries=3)
+# Columns written for newly fetched emails; the rest use server defaults
+EMAIL_COPY_COLUMNS = [
+    'id',
+    'user_id',
+    'message_id',
+    'subject',
+    'sender_email',
+    'sender_name',
+    'body_text',
+    'body_html',
+    'received_at',
+]
+
+
+@celery_app.task(base=DatabaseTask, bind=True, max_retries=3, ignore_result=True, rate_limit='50/s')
 def fetch_new_emails(self, user_id: str):
     """
     Fetch new emails for a user
@@ -39,7 +38,7 @@ def fetch_new_emails(self, user_id: str):
     Returns:
         Dict with fetch results
     """
-    db = SessionLocal()
+    db = self.db
 
     try:
         # Get user credentials
@@ -81,42 +80,43 @@ def fetch_new_emails(self, user_id: str):
             # Retry with exponential backoff
             raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
-        # Store emails in database
-        new_emails = 0
-        processed_ids = []
-
-        for email_data in emails_data:
-            try:
-                # Check if email already exists
-                existing = db.query(Email).filter(
-                    Email.message_id == email_data['message_id']
-                ).first()
-
-                if not existing:
-                    email = Email(
-                        user_id=user_id,
-                        message_id=email_data['message_id'],
-                        subject=email_data['subject'],
-                        sender_email=email_data['sender_email'],
-                        sender_name=email_data['sender_name'],
-                        body_text=email_data['body_text'],
-                        body_html=email_data.get('body_html'),
-                        received_at=email_data['received_at']
-                    )
-                    db.add(email)
-                    db.flush()  # Flush to get the ID
-                    new_emails += 1
-
-                    # Queue for processing
-                    process_email.delay(str(email.id))
-                    processed_ids.append(str(email.id))
-
-            except Exception as e:
-                logger.error(f"Error storing email {email_data.get('message_id')}: {str(e)}")
-                continue
+        # Store emails in database: COPY the whole batch into a staging table,
+        # then insert the ones not seen before in a single statement
+        rows = [
+            (
+                uuid7(),
+                user_id,
+                email_data['message_id'],
+                email_data['subject'],
+                email_data['sender_email'],
+                email_data['sender_name'],
+                email_data['body_text'],
+                email_data.get('body_html'),
+                email_data['received_at'] or datetime.utcnow(),
+            )
+            for email_data in emails_data
+        ]
+        copy_to_temp_table(db, 'emails_staging', 'emails', EMAIL_COPY_COLUMNS, rows)
+
+        column_list = ', '.join(EMAIL_COPY_COLUMNS)
+        processed_ids = [str(email_id) for email_id in db.execute(text(f"""
+            INSERT INTO emails ({column_list})
+            SELECT DISTINCT ON (staged.message_id) {column_list}
+            FROM emails_staging AS staged
+            WHERE NOT EXISTS (
+                SELECT 1 FROM emails WHERE emails.message_id = staged.message_id
+            )
+            ON CONFLICT (message_id, received_at) DO NOTHING
+            RETURNING id
+        """)).scalars()]
+        new_emails = len(processed_ids)
 
         db.commit()
 
+        # Queue for processing once the rows are visible to other workers
+        if processed_ids:
+            group(process_email.s(email_id) for email_id in processed_ids).apply_async()
+
         logger.info(f"Fetched {new_emails} new emails for user {user_id}")
         return {
             'status': 'success',
@@ -131,11 +131,8 @@ def fetch_new_emails(self, user_id: str):
         logger.error(f"Error in fetch_new_emails for user {user_id}: {str(e)}")
         raise
 
-    finally:
-        db.close()
 
-
-@celery_app.task(base=DatabaseTask, bind=True)
+@celery_app.task(base=DatabaseTask, bind=True, ignore_result=True)
 def sync_all_users_emails(self):
     """
     Periodic task to sync emails for all active users
@@ -143,11 +140,11 @@ def sync_all_users_emails(self):
     Returns:
         Dict with sync results for all users
     """
-    db = SessionLocal()
+    db = self.db
 
     try:
-        # Get all users
-        users = db.query(User).all()
+        # Get all users (tokens and preferences aren't needed to queue syncs)
+        users = db.query(User).options(load_only(User.id, User.email)).all()
 
         results = {
             'total_users': len(users),
@@ -156,10 +153,10 @@ def sync_all_users_emails(self):
             'details': []
         }
 
-        for user in users:
-            try:
-                # Queue email fetch for each user
-                task = fetch_new_emails.delay(str(user.id))
+        try:
+            # Queue email fetch for every user in one group dispatch
+            group_result = group(fetch_new_emails.s(str(user.id)) for user in users).apply_async()
+            for user, task in zip(users, group_result.results):
                 results['successful'] += 1
                 results['details'].append({
                     'user_id': str(user.id),
@@ -167,7 +164,8 @@ def sync_all_users_emails(self):
                     'task_id': task.id,
                     'status': 'queued'
                 })
-            except Exception as e:
+        except Exception as e:
+            for user in users:
                 results['failed'] += 1
                 results['details'].append({
                     'user_id': str(user.id),
@@ -175,7 +173,7 @@ def sync_all_users_emails(self):
                     'status': 'failed',
                     'error': str(e)
                 })
-                logger.error(f"Failed to queue sync for user {user.id}: {str(e)}")
+            logger.error(f"Failed to queue sync for {len(users)} users: {str(e)}")
 
         logger.info(f"Sync queued for {results['successful']}/{results['total_users']} users")
         return results
@@ -184,9 +182,6 @@ def sync_all_users_emails(self):
         logger.error(f"Error in sync_all_users_emails: {str(e)}")
         raise
 
-    finally:
-        db.close()
-
 
 @celery_app.task(base=DatabaseTask, bind=True, max_retries=3)
 def sync_user_emails_with_retry(self, user_id: str, max_results: int = 50):
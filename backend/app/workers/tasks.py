@@ -1,7 +1,16 @@
-from app.workers.celery_app import celery_app
+from celery import group
+from openai import OpenAIError
+from app.celery_app import celery_app
 
 
-@celery_app.task(name="process_email")
+# Callers never read these results, so skip the result-backend write per task
+@celery_app.task(
+    name="process_email",
+    ignore_result=True,
+    autoretry_for=(OpenAIError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5}
+)
 def process_email(email_id: str):
     """
     Process an email: classify, prioritize, and optionally generate response
@@ -10,7 +19,17 @@ def process_email(email_id: str):
     pass
 
 
-@celery_app.task(name="sync_emails")
+@celery_app.task(name="process_email_batch", ignore_result=True)
+def process_email_batch(email_ids: list[str]):
+    """
+    Queue processing for many emails with a single group dispatch
+    """
+    # One publish over a single producer connection, instead of one
+    # delay() round trip per email
+    group(process_email.s(email_id) for email_id in email_ids).apply_async()
+
+
+@celery_app.task(name="sync_emails", ignore_result=True)
 def sync_emails(user_id: str):
     """
     Sync emails from email provider for a specific user
@@ -19,7 +38,13 @@ def sync_emails(user_id: str):
     pass
 
 
-@celery_app.task(name="generate_response")
+@celery_app.task(
+    name="generate_response",
+    ignore_result=True,
+    autoretry_for=(OpenAIError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5}
+)
 def generate_response(email_id: str, tone: str = "professional"):
     """
     Generate AI response for an email
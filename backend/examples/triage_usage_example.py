@@ -6,6 +6,7 @@ for email classification, priority assignment, and semantic search.
 """
 
 import asyncio
+import sys
 from app.services import (
     TriageService,
     PriorityEngine,
@@ -13,9 +14,14 @@ from app.services import (
     ConfidenceService,
     CompleteTriageService
 )
+from sqlalchemy import select
+from sqlalchemy.orm import undefer_group
 from app.models.email import Email
 from app.core.database import SessionLocal
 
+# Emails triaged concurrently in example_batch_processing
+BATCH_CONCURRENCY = 16
+
 
 # Example 1: Basic Email Classification
 async def example_basic_classification():
@@ -91,11 +97,11 @@ async def example_semantic_search():
     """Generate embeddings and find similar emails"""
 
     embedding_service = EmbeddingService()
-    db = SessionLocal()
 
-    try:
+    with SessionLocal() as db:
         # Get an email from database
-        email = db.query(Email).first()
+        # The body feeds the embedding; load it with the row, not lazily
+        email = db.query(Email).options(undefer_group('body')).first()
 
         if email:
             # Generate embedding
@@ -107,15 +113,12 @@ async def example_semantic_search():
             db.commit()
 
             # Find similar emails
-            similar_emails = embedding_service.find_similar_emails(str(email.id), limit=5)
+            similar_emails = embedding_service.find_similar_emails(str(email.id), db, limit=5)
 
             print(f"\nFound {len(similar_emails)} similar emails:")
             for similar in similar_emails:
                 print(f"  - {similar.subject[:50]}...")
 
-    finally:
-        db.close()
-
 
 # Example 4: Calculate Confidence Score
 async def example_confidence_calculation():
@@ -167,9 +170,8 @@ async def example_complete_triage():
     """Run the complete triage pipeline"""
 
     complete_triage = CompleteTriageService()
-    db = SessionLocal()
 
-    try:
+    with SessionLocal() as db:
         # Create a sample email (or fetch from database)
         email = Email(
             subject="Meeting Request: Q4 Planning",
@@ -192,7 +194,7 @@ async def example_complete_triage():
         }
 
         # Process email through complete pipeline
-        result = await complete_triage.process_email(email, user_preferences)
+        result = await complete_triage.process_email(email, user_preferences, db)
 
         print("\nComplete Triage Result:")
         print(f"  Category: {result['classification']['category']}")
@@ -205,49 +207,61 @@ async def example_complete_triage():
         print(f"  Similar Emails Found: {len(result['similar_emails'])}")
         print(f"  Reasoning: {result['classification']['reasoning']}")
 
-    finally:
-        db.close()
-
 
 # Example 6: Batch Processing Multiple Emails
 async def example_batch_processing():
     """Process multiple emails in batch"""
 
     complete_triage = CompleteTriageService()
-    db = SessionLocal()
 
-    try:
-        # Fetch unprocessed emails
-        emails = db.query(Email).filter(
-            Email.processed_at.is_(None)
-        ).limit(10).all()
+    user_preferences = {
+        'whitelist_senders': ['boss@company.com'],
+        'blacklist_senders': ['spam@example.com'],
+        'priority_rules': []
+    }
 
-        user_preferences = {
-            'whitelist_senders': ['boss@company.com'],
-            'blacklist_senders': ['spam@example.com'],
-            'priority_rules': []
-        }
+    # One session for the whole batch. Unprocessed emails are streamed from
+    # a server-side cursor, BATCH_CONCURRENCY rows at a time, rather than
+    # loaded up front.
+    with SessionLocal() as db:
+        unprocessed = db.scalars(
+            select(Email)
+            # Bodies feed classification and embedding; load them with the
+            # rows instead of one lazy SELECT per email
+            .options(undefer_group('body'))
+            .where(Email.processed_at.is_(None))
+            .limit(10)
+            .execution_options(yield_per=BATCH_CONCURRENCY)
+        )
 
-        print(f"\nProcessing {len(emails)} emails...")
+        print("\nProcessing unprocessed emails...")
 
+        # The pipeline is I/O-bound (OpenAI round trips), so run a chunk of
+        # emails concurrently rather than one after another. Sharing the
+        # session is safe: process_email only touches it on the event loop.
         results = []
-        for email in emails:
-            result = await complete_triage.process_email(email, user_preferences)
-            results.append(result)
-
-            print(f"  ✓ Processed: {email.subject[:40]}... -> {result['classification']['priority']}")
-
-        # Summary statistics
-        high_priority = sum(1 for r in results if r['classification']['priority'] in ['high', 'urgent'])
-        needs_review = sum(1 for r in results if r['requires_review'])
-
-        print(f"\nBatch Summary:")
-        print(f"  Total Processed: {len(results)}")
-        print(f"  High/Urgent Priority: {high_priority}")
-        print(f"  Needs Review: {needs_review}")
-
-    finally:
-        db.close()
+        for chunk in unprocessed.partitions():
+            chunk_results = await asyncio.gather(*(
+                complete_triage.process_email(email, user_preferences, db)
+                for email in chunk
+            ))
+            results.extend(chunk_results)
+
+            # One write per chunk instead of one print per email
+            sys.stdout.write(''.join(
+                f"  ✓ Processed: {(email.subject or '')[:40]}... -> {result['classification']['priority']}\n"
+                for email, result in zip(chunk, chunk_results)
+            ))
+            sys.stdout.flush()
+
+    # Summary statistics
+    high_priority = sum(1 for r in results if r['classification']['priority'] in ['high', 'urgent'])
+    needs_review = sum(1 for r in results if r['requires_review'])
+
+    print(f"\nBatch Summary:")
+    print(f"  Total Processed: {len(results)}")
+    print(f"  High/Urgent Priority: {high_priority}")
+    print(f"  Needs Review: {needs_review}")
 
 
 # Example 7: Error Handling
@@ -263,7 +277,8 @@ async def example_error_handling():
         sender_email=None
     )
 
-    result = await complete_triage.process_email(email, {})
+    with SessionLocal() as db:
+        result = await complete_triage.process_email(email, {}, db)
 
     print("\nError Handling Example:")
     print(f"  Classification: {result['classification']['category']}")
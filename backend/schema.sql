@@ -1,12 +1,11 @@
--- Enable UUID extension
-CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+-- gen_random_uuid() is built into PostgreSQL 13+
 
 -- Enable pgvector extension for embeddings
 CREATE EXTENSION IF NOT EXISTS vector;
 
 -- Users Table
 CREATE TABLE users (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID PRIMARY KEY,  -- UUIDv7, generated by the application
     email VARCHAR(255) UNIQUE NOT NULL,
     name VARCHAR(255),
     email_provider VARCHAR(50),
@@ -18,7 +17,7 @@ CREATE TABLE users (
 
 -- Emails Table
 CREATE TABLE emails (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID PRIMARY KEY,  -- UUIDv7, generated by the application
     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
     message_id VARCHAR(255) UNIQUE NOT NULL,
     subject TEXT,
@@ -33,7 +32,7 @@ CREATE TABLE emails (
     urgency_score DECIMAL(3,2),
     sentiment VARCHAR(20),
     requires_action BOOLEAN DEFAULT FALSE,
-    embedding VECTOR(1536),
+    embedding HALFVEC(1536),  -- FP16, pgvector 0.7+
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -41,10 +40,11 @@ CREATE TABLE emails (
 CREATE INDEX idx_user_received ON emails(user_id, received_at DESC);
 CREATE INDEX idx_category ON emails(category);
 CREATE INDEX idx_priority ON emails(priority);
+CREATE INDEX idx_emails_embedding ON emails USING hnsw (embedding halfvec_cosine_ops);
 
 -- Email Classifications Table
 CREATE TABLE email_classifications (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID PRIMARY KEY,  -- UUIDv7, generated by the application
     email_id UUID REFERENCES emails(id) ON DELETE CASCADE,
     classification_type VARCHAR(50),
     classification_value VARCHAR(100),
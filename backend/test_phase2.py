@@ -12,10 +12,10 @@ from pathlib import Path
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.core.database import SessionLocal, engine
+from app.core.database import engine
 from app.models import User, Email, EmailClassification
 from app.core.config import settings
-from sqlalchemy import inspect
+from sqlalchemy import inspect as sa_inspect, text
 
 
 def test_database_connection():
@@ -23,15 +23,16 @@ def test_database_connection():
     print("🔍 Testing database connection...")
 
     try:
-        db = SessionLocal()
-
-        # Test connection
-        db.execute("SELECT 1")
+        # Connectivity check and table list in a single round trip, on the
+        # app's pooled engine
+        with engine.connect() as connection:
+            row = connection.execute(text("""
+                SELECT 1 AS ok,
+                       array(SELECT tablename FROM pg_tables WHERE schemaname = 'public') AS tables
+            """)).one()
         print("✅ Database connection successful")
 
-        # Check if tables exist
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
+        tables = set(row.tables)
 
         required_tables = ['users', 'emails', 'email_classifications']
         for table in required_tables:
@@ -41,7 +42,6 @@ def test_database_connection():
                 print(f"❌ Table '{table}' missing - run migrations!")
                 return False
 
-        db.close()
         return True
 
     except Exception as e:
@@ -54,29 +54,19 @@ def test_models():
     print("\n🔍 Testing SQLAlchemy models...")
 
     try:
-        # Test User model
-        user_attrs = ['id', 'email', 'google_id', 'access_token', 'refresh_token']
-        for attr in user_attrs:
-            if hasattr(User, attr):
-                print(f"✅ User.{attr} exists")
-            else:
-                print(f"❌ User.{attr} missing")
-
-        # Test Email model
-        email_attrs = ['id', 'user_id', 'message_id', 'subject', 'body_text']
-        for attr in email_attrs:
-            if hasattr(Email, attr):
-                print(f"✅ Email.{attr} exists")
-            else:
-                print(f"❌ Email.{attr} missing")
-
-        # Test EmailClassification model
-        classification_attrs = ['id', 'email_id', 'category', 'priority']
-        for attr in classification_attrs:
-            if hasattr(EmailClassification, attr):
-                print(f"✅ EmailClassification.{attr} exists")
-            else:
-                print(f"❌ EmailClassification.{attr} missing")
+        # Compare against each model's mapped attribute names, read once per model
+        required_attrs = {
+            User: ['id', 'email', 'google_id', 'access_token', 'refresh_token'],
+            Email: ['id', 'user_id', 'message_id', 'subject', 'body_text'],
+            EmailClassification: ['id', 'email_id', 'category', 'priority'],
+        }
+        for model, attrs in required_attrs.items():
+            mapped = set(sa_inspect(model).attrs.keys())
+            for attr in attrs:
+                if attr in mapped:
+                    print(f"✅ {model.__name__}.{attr} exists")
+                else:
+                    print(f"❌ {model.__name__}.{attr} missing")
 
         return True
 
@@ -150,8 +140,10 @@ def test_celery_connection():
     try:
         from app.celery_app import celery_app
 
-        # Ping Redis
-        result = celery_app.control.inspect().ping()
+        # One broker connection for the broadcast, and a bounded wait for
+        # replies so a missing worker doesn't stall the check
+        with celery_app.connection_for_write() as conn:
+            result = celery_app.control.inspect(connection=conn, timeout=0.5).ping()
         if result:
             print(f"✅ Celery workers active: {list(result.keys())}")
             return True
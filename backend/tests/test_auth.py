@@ -0,0 +1,171 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from app.api.v1 import auth
+from app.core.config import settings
+from app.core.database import get_db
+from app.main import app
+
+CALLBACK_URL = f"{settings.API_V1_STR}/auth/google/callback"
+
+
+def google_transport(requests: list, token_response: dict, user_info: dict) -> httpx.MockTransport:
+    """Mock Google's token and userinfo endpoints, recording each request"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if str(request.url) == auth.GOOGLE_TOKEN_URI:
+            return httpx.Response(200, json=token_response)
+        if str(request.url) == auth.GOOGLE_USERINFO_URI:
+            return httpx.Response(200, json=user_info)
+        return httpx.Response(404)
+
+    return httpx.MockTransport(handler)
+
+
+def patch_google(transport: httpx.MockTransport):
+    """Route auth's httpx.AsyncClient instances through the mock transport"""
+    real_client = httpx.AsyncClient
+    return mock.patch.object(
+        auth.httpx, 'AsyncClient',
+        lambda **kwargs: real_client(transport=transport, **kwargs)
+    )
+
+
+def test_request_google_token_posts_client_credentials():
+    """Test the token grant is posted as a form with the OAuth client credentials"""
+    requests = []
+    transport = google_transport(requests, {'access_token': 'at', 'expires_in': 3600}, {})
+
+    with patch_google(transport):
+        tokens = asyncio.run(auth.request_google_token({'grant_type': 'authorization_code', 'code': 'c'}))
+
+    assert tokens == {'access_token': 'at', 'expires_in': 3600}
+    assert len(requests) == 1
+    form = dict(httpx.QueryParams(requests[0].content.decode()))
+    assert requests[0].method == 'POST'
+    assert form == {
+        'grant_type': 'authorization_code',
+        'code': 'c',
+        'client_id': settings.GOOGLE_CLIENT_ID,
+        'client_secret': settings.GOOGLE_CLIENT_SECRET,
+    }
+
+
+def test_get_user_info_maps_sub_to_id():
+    """Test userinfo is fetched with the bearer token and `sub` becomes `id`"""
+    requests = []
+    transport = google_transport(requests, {}, {'sub': 'g-1', 'email': 'a@example.com'})
+
+    with patch_google(transport):
+        user_info = asyncio.run(auth.get_user_info('at'))
+
+    assert user_info == {'sub': 'g-1', 'id': 'g-1', 'email': 'a@example.com'}
+    assert requests[0].headers['Authorization'] == 'Bearer at'
+
+
+def test_get_user_info_error_raises_http_exception():
+    """Test a failed userinfo call surfaces as a 500"""
+    transport = httpx.MockTransport(lambda request: httpx.Response(401))
+
+    with patch_google(transport), pytest.raises(HTTPException) as exc_info:
+        asyncio.run(auth.get_user_info('expired'))
+
+    assert exc_info.value.status_code == 500
+
+
+def test_callback_upserts_user_on_google_id():
+    """Test the callback writes the user with one INSERT ... ON CONFLICT (google_id) DO UPDATE"""
+    executed = []
+    user_id = uuid.uuid4()
+
+    class FakeSession:
+        async def execute(self, stmt):
+            executed.append(stmt)
+            return SimpleNamespace(one=lambda: SimpleNamespace(id=user_id, email='a@example.com'))
+
+        async def commit(self):
+            pass
+
+        async def rollback(self):
+            pass
+
+    async def fake_db():
+        yield FakeSession()
+
+    transport = google_transport(
+        [],
+        {'access_token': 'at', 'refresh_token': 'rt', 'expires_in': 3600},
+        {'sub': 'g-1', 'email': 'a@example.com', 'name': 'A'}
+    )
+
+    app.dependency_overrides[get_db] = fake_db
+    try:
+        with patch_google(transport):
+            response = TestClient(app).get(CALLBACK_URL, params={'code': 'c', 'state': 's'})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()['user_id'] == str(user_id)
+
+    assert len(executed) == 1
+    sql = ' '.join(str(executed[0].compile(dialect=postgresql.dialect())).split())
+    assert sql.startswith('INSERT INTO users')
+    assert 'ON CONFLICT (google_id) DO UPDATE SET' in sql
+    # A sign-in without a new refresh token or name keeps the stored ones
+    assert 'refresh_token = coalesce(excluded.refresh_token, users.refresh_token)' in sql
+    assert 'name = coalesce(excluded.name, users.name)' in sql
+    assert sql.endswith('RETURNING users.id, users.email')
+
+
+@pytest.fixture
+def sync_engine():
+    """Engine on the configured database; skips when it isn't reachable"""
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1 FROM users LIMIT 1'))
+    except Exception:
+        engine.dispose()
+        pytest.skip('PostgreSQL with the application schema is not available')
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.integration
+def test_callback_creates_then_updates_user(sync_engine):
+    """Test a first sign-in creates the user and a later one updates the same row"""
+    google_id = f'test-{uuid.uuid4()}'
+    email = f'{google_id}@example.com'
+    user_info = {'sub': google_id, 'email': email, 'name': 'First'}
+
+    def sign_in(client, token_response):
+        with patch_google(google_transport([], token_response, user_info)):
+            return client.get(CALLBACK_URL, params={'code': 'c', 'state': 's'})
+
+    try:
+        with TestClient(app) as client:
+            created = sign_in(client, {'access_token': 'at-1', 'refresh_token': 'rt-1', 'expires_in': 3600})
+            # Google only returns a refresh token on the first consent
+            updated = sign_in(client, {'access_token': 'at-2', 'expires_in': 3600})
+
+        assert created.status_code == 200
+        assert updated.status_code == 200
+        assert updated.json()['user_id'] == created.json()['user_id']
+
+        with sync_engine.connect() as conn:
+            rows = conn.execute(
+                text('SELECT access_token, refresh_token, name FROM users WHERE google_id = :google_id'),
+                {'google_id': google_id}
+            ).all()
+        assert [tuple(row) for row in rows] == [('at-2', 'rt-1', 'First')]
+    finally:
+        with sync_engine.begin() as conn:
+            conn.execute(text('DELETE FROM users WHERE google_id = :google_id'), {'google_id': google_id})
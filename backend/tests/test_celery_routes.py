@@ -0,0 +1,32 @@
+import pytest
+from app.celery_app import celery_app
+
+# Tasks that write through COPY must not run on the gevent (triage) worker
+EXPECTED_QUEUES = {
+    'app.workers.email_processor.process_email': 'triage',
+    'app.workers.email_processor.batch_process_emails': 'triage',
+    'app.workers.email_processor.batch_embed_emails': 'sync',
+    'app.workers.email_processor.process_email_chunk': 'sync',
+    'app.workers.sync_worker.fetch_new_emails': 'sync',
+    'app.workers.sync_worker.sync_all_users_emails': 'sync',
+    'app.workers.sync_worker.sync_user_emails_with_retry': 'sync',
+    'app.workers.maintenance.maintain_email_partitions': 'celery',
+    'process_email': 'triage',
+    'process_email_batch': 'triage',
+    'generate_response': 'triage',
+    'sync_emails': 'sync',
+}
+
+
+def test_every_task_has_an_expected_queue():
+    """Test the route table below covers every task the app registers"""
+    celery_app.loader.import_default_modules()
+    registered = {name for name in celery_app.tasks if not name.startswith('celery.')}
+    assert registered == set(EXPECTED_QUEUES)
+
+
+@pytest.mark.parametrize('task_name, queue', EXPECTED_QUEUES.items())
+def test_task_route(task_name, queue):
+    """Test each task is routed to the queue whose worker can run it"""
+    route = celery_app.amqp.router.route({}, task_name)
+    assert route['queue'].name == queue
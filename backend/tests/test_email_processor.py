@@ -0,0 +1,58 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+import uuid
+from sqlalchemy.orm import Query
+from app.workers import email_processor
+
+
+def test_store_embeddings_copies_and_updates():
+    """Test embeddings are COPYed into a staging table and applied with one UPDATE"""
+    emails = [
+        SimpleNamespace(id=uuid.UUID(int=1), received_at=datetime(2025, 10, 1, 12, 0), subject='a', body_text='x'),
+        SimpleNamespace(id=uuid.UUID(int=2), received_at=datetime(2025, 10, 2, 12, 0), subject='b', body_text=None),
+    ]
+    # The second embedding failed (all zeros), so only the first is stored
+    embeddings = [[0.5, 0.25], [0.0, 0.0]]
+
+    copied = {}
+    cursor = mock.Mock()
+    cursor.copy_expert.side_effect = lambda sql, buffer: copied.update(sql=sql, data=buffer.read())
+    db = mock.Mock()
+    db.connection.return_value.connection.cursor.return_value = cursor
+
+    with mock.patch.object(email_processor.embedding_service, 'embed_batch', return_value=embeddings) as embed_batch:
+        stored = email_processor._store_embeddings(db, emails)
+
+    assert stored == 1
+    embed_batch.assert_called_once_with(['a x', 'b '])
+
+    statements = [str(call.args[0]) for call in db.execute.call_args_list]
+    assert statements[0] == (
+        'CREATE TEMP TABLE email_embeddings_staging ON COMMIT DROP AS '
+        'SELECT id, received_at, embedding FROM emails WITH NO DATA'
+    )
+    assert copied['sql'] == 'COPY email_embeddings_staging (id, received_at, embedding) FROM STDIN'
+    assert copied['data'] == f'{emails[0].id}\t2025-10-01 12:00:00\t[0.5,0.25]\n'
+    cursor.close.assert_called_once()
+
+    update = ' '.join(statements[1].split())
+    assert update.startswith('UPDATE emails SET embedding = staged.embedding FROM email_embeddings_staging AS staged')
+    # The partition key is matched too, so each row only touches its own partition
+    assert 'emails.id = staged.id AND emails.received_at = staged.received_at' in update
+    assert len(statements) == 2
+
+
+def test_load_emails_for_embedding_loads_body_in_one_query():
+    """Test the deferred body_text is loaded by the chunk query itself, without body_html"""
+    db = mock.Mock()
+    email_processor._load_emails_for_embedding(db, [uuid.UUID(int=1)])
+
+    query = db.query.return_value.options.return_value.filter.return_value
+    query.all.assert_called_once()
+
+    options = db.query.return_value.options.call_args.args
+    sql = str(Query(email_processor.Email).options(*options).statement.compile())
+    columns = sql.split('FROM')[0]
+    assert 'emails.body_text' in columns
+    assert 'emails.body_html' not in columns
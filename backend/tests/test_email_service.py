@@ -0,0 +1,71 @@
+from unittest import mock
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from app.services import email_service
+from app.services.email_service import EmailService
+
+
+def http_error(status: int, retry_after: str = None) -> HttpError:
+    headers = {'status': status}
+    if retry_after is not None:
+        headers['retry-after'] = retry_after
+    return HttpError(httplib2.Response(headers), b'{}')
+
+
+@pytest.fixture
+def service():
+    # _execute_with_retry doesn't touch the Gmail client
+    return EmailService.__new__(EmailService)
+
+
+@pytest.fixture
+def sleep():
+    with mock.patch.object(email_service.time, 'sleep') as sleep:
+        yield sleep
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_retry_honours_retry_after(service, sleep, status):
+    """Test a rate limited request is retried after the server's Retry-After delay"""
+    request = mock.Mock()
+    request.execute.side_effect = [http_error(status, retry_after='7'), 'ok']
+
+    assert service._execute_with_retry(request, http='http') == 'ok'
+    sleep.assert_called_once_with(7)
+    assert request.execute.call_args_list == [mock.call(http='http')] * 2
+
+
+def test_retry_backs_off_without_retry_after(service, sleep):
+    """Test exponential backoff (with jitter) is used when Retry-After is absent"""
+    request = mock.Mock()
+    request.execute.side_effect = [http_error(429), http_error(503), 'ok']
+
+    with mock.patch.object(email_service.random, 'random', return_value=0.5):
+        assert service._execute_with_retry(request) == 'ok'
+
+    assert sleep.call_args_list == [mock.call(1.5), mock.call(2.5)]
+
+
+def test_retry_gives_up_after_max_retries(service, sleep):
+    """Test the last rate limit error is raised once retries are exhausted"""
+    request = mock.Mock()
+    request.execute.side_effect = http_error(429, retry_after='1')
+
+    with pytest.raises(HttpError):
+        service._execute_with_retry(request, max_retries=2)
+
+    assert request.execute.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_non_retryable_error_is_raised(service, sleep):
+    """Test errors other than 429/503 are raised without retrying"""
+    request = mock.Mock()
+    request.execute.side_effect = http_error(404)
+
+    with pytest.raises(HttpError):
+        service._execute_with_retry(request)
+
+    assert request.execute.call_count == 1
+    sleep.assert_not_called()
@@ -0,0 +1,24 @@
+from sqlalchemy import MetaData
+from app.core.database import Base
+from app.models import EmailClassification
+
+
+def test_declarative_metadata_not_shadowed():
+    """Test model attributes don't shadow the declarative MetaData"""
+    assert isinstance(Base.metadata, MetaData)
+    assert EmailClassification.metadata is Base.metadata
+
+
+def test_classification_extra_metadata_column():
+    """Test extra_metadata maps to the metadata column"""
+    column = EmailClassification.__table__.c['metadata']
+    assert EmailClassification.extra_metadata.property.columns[0] is column
+
+
+def test_classification_email_join_without_foreign_key():
+    """Test classifications join emails by id without a FK to the partitioned table"""
+    from app.models import Email
+
+    assert not EmailClassification.__table__.c['email_id'].foreign_keys
+    pairs = EmailClassification.email.property.local_remote_pairs
+    assert pairs == [(EmailClassification.__table__.c['email_id'], Email.__table__.c['id'])]
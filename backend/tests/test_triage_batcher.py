@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from app.services.triage_batcher import TriageBatcher
+
+
+class FakeTriageService:
+    """Records each classify_batch call and echoes the subjects back"""
+
+    def __init__(self, release: threading.Event = None):
+        self.batches = []
+        self.release = release
+
+    def classify_batch(self, emails):
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        self.batches.append([email['subject'] for email in emails])
+        return [{'subject': email['subject']} for email in emails]
+
+
+def classify(batcher, subject):
+    return batcher.classify_email(subject=subject, body='', sender='a@b.com')
+
+
+def test_flush_on_batch_size():
+    """Test a full batch is sent without waiting for the timer"""
+    service = FakeTriageService()
+    batcher = TriageBatcher(service, max_batch_size=3, max_wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(classify(batcher, f's{i}') for i in range(3))),
+            timeout=5
+        )
+
+    results = asyncio.run(run())
+    assert [r['subject'] for r in results] == ['s0', 's1', 's2']
+    assert service.batches == [['s0', 's1', 's2']]
+
+
+def test_flush_on_timeout():
+    """Test a partial batch is sent once max_wait_ms elapses"""
+    service = FakeTriageService()
+    batcher = TriageBatcher(service, max_batch_size=16, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(classify(batcher, 'a'), classify(batcher, 'b')),
+            timeout=5
+        )
+
+    results = asyncio.run(run())
+    assert [r['subject'] for r in results] == ['a', 'b']
+    assert service.batches == [['a', 'b']]
+
+
+def test_cancelled_caller_is_dropped():
+    """Test a caller cancelled while queued is left out and doesn't break the batch"""
+    service = FakeTriageService()
+    batcher = TriageBatcher(service, max_batch_size=16, max_wait_ms=50)
+
+    async def run():
+        cancelled = asyncio.create_task(classify(batcher, 'cancelled'))
+        kept = asyncio.create_task(classify(batcher, 'kept'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await asyncio.wait_for(kept, timeout=5)
+
+    assert asyncio.run(run()) == {'subject': 'kept'}
+    assert service.batches == [['kept']]
+
+
+def test_cancelled_during_batch():
+    """Test a caller cancelled while its batch is in flight doesn't strand the others"""
+    release = threading.Event()
+    service = FakeTriageService(release)
+    batcher = TriageBatcher(service, max_batch_size=2, max_wait_ms=10_000)
+
+    async def run():
+        cancelled = asyncio.create_task(classify(batcher, 'cancelled'))
+        kept = asyncio.create_task(classify(batcher, 'kept'))
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        release.set()
+        return await asyncio.wait_for(kept, timeout=5)
+
+    assert asyncio.run(run()) == {'subject': 'kept'}
+
+
+def test_reuse_across_event_loops():
+    """Test the batcher still works in a new loop after a call was abandoned in another"""
+    service = FakeTriageService()
+    batcher = TriageBatcher(service, max_batch_size=16, max_wait_ms=10_000)
+
+    async def abandon():
+        task = asyncio.create_task(classify(batcher, 'abandoned'))
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(abandon())
+
+    batcher.max_wait = 0.01
+    result = asyncio.run(asyncio.wait_for(classify(batcher, 'next'), timeout=5))
+    assert result == {'subject': 'next'}
+    assert service.batches == [['next']]
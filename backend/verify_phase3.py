@@ -40,19 +40,16 @@ def verify_models():
         from app.models.user import User
         from app.models.email_classification import EmailClassification
 
-        # Check Email model
-        assert hasattr(Email, 'embedding'), "Email missing embedding field"
-        assert hasattr(Email, 'subject'), "Email missing subject field"
-        assert hasattr(Email, 'body_text'), "Email missing body_text field"
-        assert hasattr(Email, 'sender_email'), "Email missing sender_email field"
+        from sqlalchemy import inspect as sa_inspect
 
-        # Check User model
-        assert hasattr(User, 'preferences'), "User missing preferences field"
-        assert hasattr(User, 'email'), "User missing email field"
-
-        # Check EmailClassification model
-        assert hasattr(EmailClassification, 'category'), "EmailClassification missing category"
-        assert hasattr(EmailClassification, 'confidence_score'), "EmailClassification missing confidence_score"
+        required_fields = {
+            Email: {'embedding', 'subject', 'body_text', 'sender_email'},
+            User: {'preferences', 'email'},
+            EmailClassification: {'category', 'confidence_score'},
+        }
+        for model, fields in required_fields.items():
+            missing = fields - set(sa_inspect(model).attrs.keys())
+            assert not missing, f"{model.__name__} missing {', '.join(sorted(missing))}"
 
         print("   ✓ Models have all required fields")
         return True
@@ -172,19 +169,27 @@ def verify_dependencies():
 
     dependencies = [
         ('openai', '1.10.0'),
-        ('pgvector', '0.2.4'),
+        ('pgvector', '0.3.2'),
         ('sqlalchemy', '2.0.25'),
         ('pydantic', '2.5.3'),
     ]
 
+    # Read installed package versions in one pass over site-packages
+    # instead of one metadata lookup per package
+    from importlib.metadata import distributions
+    installed = {
+        dist.metadata['Name'].lower(): dist.version
+        for dist in distributions()
+        if dist.metadata['Name']
+    }
+
     all_ok = True
     for package, min_version in dependencies:
-        try:
-            import importlib.metadata
-            version = importlib.metadata.version(package)
+        version = installed.get(package)
+        if version:
             print(f"   ✓ {package} {version} installed")
-        except Exception as e:
-            print(f"   ✗ {package} not found or error: {e}")
+        else:
+            print(f"   ✗ {package} not found")
             all_ok = False
 
     return all_ok